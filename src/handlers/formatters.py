@@ -189,7 +189,8 @@ class SafeMessageEditor:
         new_text: str,
         reply_markup=None,
         parse_mode: str = 'HTML',
-        max_attempts: int = None
+        max_attempts: int = None,
+        _sleep=asyncio.sleep
     ) -> bool:
         """
         Безопасно редактировать сообщение с проверкой изменений
@@ -200,6 +201,7 @@ class SafeMessageEditor:
             reply_markup: Новая клавиатура
             parse_mode: Режим парсинга
             max_attempts: Максимум попыток
+            _sleep: Функция паузы между попытками (подменяется в тестах)
             
         Returns:
             bool: True если успешно отредактировано
@@ -241,7 +243,7 @@ class SafeMessageEditor:
                     
                 elif "bad request" in error_msg and attempt < max_attempts - 1:
                     logger.warning(f"Bad request on attempt {attempt + 1}, retrying...")
-                    await asyncio.sleep(0.5)
+                    await _sleep(0.5)
                     continue
                     
                 else:
@@ -251,7 +253,7 @@ class SafeMessageEditor:
             except Exception as e:
                 logger.error(f"Unexpected error editing message: {e}")
                 if attempt < max_attempts - 1:
-                    await asyncio.sleep(0.5)
+                    await _sleep(0.5)
                     continue
                 return False
         
@@ -280,10 +282,9 @@ class SafeMessageEditor:
         timeout = timeout or config.CALLBACK_ANSWER_TIMEOUT
         
         try:
-            await asyncio.wait_for(
-                callback_query.answer(text=text, show_alert=show_alert),
-                timeout=timeout
-            )
+            # asyncio.timeout не создает отдельную задачу, в отличие от asyncio.wait_for
+            async with asyncio.timeout(timeout):
+                await callback_query.answer(text=text, show_alert=show_alert)
             logger.debug("Callback query answered successfully")
             return True
             
@@ -4,9 +4,9 @@ Unified Cache Manager for Crypto Helper Bot
 Решает проблему Memory Leak с TTL cleanup и ограничением размера кэша
 """
 
-import asyncio
+import heapq
 import time
-from typing import Dict, Optional, Any, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Any, Set, Tuple
 from dataclasses import dataclass
 from collections import OrderedDict
 import threading
@@ -15,13 +15,16 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class CacheEntry:
-    """Запись в кэше с метаданными"""
+    """Запись в кэше с метаданными (объекты переиспользуются через freelist менеджера)"""
     data: Any
     timestamp: float
     access_count: int = 0
     last_access: float = None
+    size: int = 0  # Оценка размера записи в байтах (считается один раз при set)
+    protected: bool = False  # Сегмент SLRU: False - probation, True - protected
+    expires_at: float = 0.0  # Момент истечения TTL (по часам менеджера)
     
     def __post_init__(self):
         if self.last_access is None:
@@ -31,41 +34,87 @@ class CacheEntry:
 class UnifiedCacheManager:
     """
     Унифицированный менеджер кэша с:
-    - TTL (Time To Live) cleanup
-    - LRU (Least Recently Used) eviction
-    - Ограничение размера кэша
+    - TTL (Time To Live) cleanup: ленивое, по min-heap сроков истечения,
+      выполняется небольшими порциями при get/set без фоновой задачи
+    - SLRU (Segmented LRU) eviction: новые записи попадают в probation,
+      повторное обращение переводит запись в protected. Вытеснение идет
+      из probation, поэтому поток разовых ключей не вымывает горячие записи
+    - Ограничение размера кэша по числу записей и (опционально) по байтам
+    - Опциональный doorkeeper: в заполненный кэш новый ключ допускается только
+      при повторном set, поэтому разовые ключи не вызывают вытеснений
     - Мониторинг использования памяти
     """
     
+    # Доля max_size, отведенная защищенному сегменту SLRU
+    PROTECTED_RATIO = 0.8
+    
+    # Сколько просроченных записей удаляется за один get/set
+    EXPIRE_BATCH = 32
+    
+    # Политики допуска новых ключей в заполненный кэш
+    ADMISSION_POLICIES = ('none', 'doorkeeper')
+    
+    # Во сколько раз doorkeeper может превысить max_size до сброса
+    DOORKEEPER_RATIO = 10
+    
     def __init__(
         self,
         max_size: int = 100,
         default_ttl: int = 300,  # 5 минут
-        cleanup_interval: int = 60,  # Очистка каждую минуту
-        enable_stats: bool = True
+        cleanup_interval: int = 60,  # Сохранен для совместимости: очистка ленивая
+        enable_stats: bool = True,
+        time_source: Callable[[], float] = time.monotonic,
+        max_bytes: Optional[int] = None,  # Лимит оценочного объема памяти (None - без лимита)
+        admission: str = 'none'  # 'doorkeeper' - новый ключ в полный кэш только со 2-го раза
     ):
+        if admission not in self.ADMISSION_POLICIES:
+            raise ValueError(f"Unknown admission policy: {admission}")
+        
         self.max_size = max_size
+        self.admission = admission
+        self.max_bytes = max_bytes
         self.default_ttl = default_ttl
         self.cleanup_interval = cleanup_interval
         self.enable_stats = enable_stats
         
-        # LRU cache implementation
-        self._cache: OrderedDict[str, CacheEntry] = OrderedDict()
+        # Источник времени для TTL (монотонный; в тестах подменяется фейковыми часами)
+        self._now = time_source
+        
+        # SLRU cache implementation: два LRU-сегмента
+        self._probation: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._protected: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._protected_max = max(1, int(max_size * self.PROTECTED_RATIO))
         self._lock = threading.RLock()
         
-        # Статистика кэша
+        # Статистика кэша: счетчики обновляются на месте, производные поля
+        # (размер, hit ratio, утилизация, MB) пересчитываются в get_stats()
         self._stats = {
+            'current_size': 0,
+            'max_size': max_size,
+            'max_bytes': max_bytes,
             'hits': 0,
             'misses': 0,
+            'hit_ratio': 0.0,
             'evictions': 0,
+            'admission_rejections': 0,
             'ttl_cleanups': 0,
             'total_sets': 0,
-            'memory_usage_bytes': 0
+            'memory_usage_bytes': 0,
+            'memory_usage_mb': 0.0,
+            'utilization': 0.0,
+            'bytes_utilization': 0.0
         }
         
-        # Background cleanup task
-        self._cleanup_task: Optional[asyncio.Task] = None
-        self._running = False
+        # Ключи, которые уже пытались попасть в заполненный кэш (admission='doorkeeper')
+        self._doorkeeper: Set[str] = set()
+        
+        # Min-heap (expires_at, key) с ленивым удалением: устаревшие элементы
+        # кучи (перезаписанные или вытесненные ключи) пропускаются при извлечении
+        self._expiry_heap: List[Tuple[float, str]] = []
+        
+        # Freelist удаленных записей (не больше max_size): set переиспользует
+        # их вместо создания новых объектов при постоянном вытеснении
+        self._freelist: List[CacheEntry] = []
         
         logger.info(
             f"🗄️ Cache Manager initialized\n"
@@ -76,22 +125,11 @@ class UnifiedCacheManager:
         )
     
     async def start(self):
-        """Запуск background cleanup task"""
-        if not self._running:
-            self._running = True
-            self._cleanup_task = asyncio.create_task(self._background_cleanup())
-            logger.info("✅ Cache Manager background cleanup started")
+        """Совместимость: фоновая задача не нужна, очистка выполняется при get/set"""
+        logger.info("✅ Cache Manager started (lazy TTL cleanup)")
     
     async def stop(self):
-        """Остановка background cleanup task"""
-        self._running = False
-        if self._cleanup_task:
-            self._cleanup_task.cancel()
-            try:
-                await self._cleanup_task
-            except asyncio.CancelledError:
-                pass
-            self._cleanup_task = None
+        """Совместимость: фоновой задачи нет, останавливать нечего"""
         logger.info("⏹️ Cache Manager stopped")
     
     def get(self, key: str) -> Optional[Any]:
@@ -105,29 +143,57 @@ class UnifiedCacheManager:
             Значение или None если не найдено/устарело
         """
         with self._lock:
-            if key not in self._cache:
-                self._stats['misses'] += 1
-                return None
-            
-            entry = self._cache[key]
-            current_time = time.time()
-            
-            # Проверяем TTL
-            if current_time - entry.timestamp > self.default_ttl:
-                logger.debug(f"Cache key '{key}' expired (TTL: {self.default_ttl}s)")
-                del self._cache[key]
-                self._stats['misses'] += 1
-                self._stats['ttl_cleanups'] += 1
-                return None
+            current_time = self._now()
+            self._expire(current_time, self.EXPIRE_BATCH)
+            return self._lookup(key, current_time)
+    
+    def bulk_get(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Получить несколько значений из кэша за одну операцию
+        
+        Блокировка, чтение часов и очистка по TTL выполняются один раз на пакет;
+        LRU порядок и статистика обновляются для каждого ключа, как в get().
+        
+        Args:
+            keys: Ключи кэша
             
-            # Обновляем LRU order и статистику доступа
-            entry.access_count += 1
-            entry.last_access = current_time
-            self._cache.move_to_end(key)  # Перемещаем в конец (most recently used)
+        Returns:
+            Словарь {ключ: значение} только для найденных и не устаревших ключей
+        """
+        with self._lock:
+            current_time = self._now()
+            self._expire(current_time, self.EXPIRE_BATCH)
             
-            self._stats['hits'] += 1
-            logger.debug(f"Cache HIT for key '{key}' (access #{entry.access_count})")
-            return entry.data
+            found = {}
+            for key in keys:
+                value = self._lookup(key, current_time)
+                if value is not None:
+                    found[key] = value
+            return found
+    
+    def _lookup(self, key: str, current_time: float) -> Optional[Any]:
+        """Найти значение с проверкой TTL и обновлением LRU (вызывается под блокировкой)"""
+        entry = self._find(key)
+        if entry is None:
+            self._stats['misses'] += 1
+            return None
+        
+        # Проверяем TTL (запись могла не попасть в порцию _expire)
+        if current_time > entry.expires_at:
+            logger.debug("Cache key '%s' expired", key)
+            self._remove(key, entry)
+            self._stats['misses'] += 1
+            self._stats['ttl_cleanups'] += 1
+            return None
+        
+        # Обновляем LRU order и статистику доступа
+        entry.access_count += 1
+        entry.last_access = current_time
+        self._touch(key, entry)  # Перемещаем в конец (most recently used)
+        
+        self._stats['hits'] += 1
+        logger.debug("Cache HIT for key '%s' (access #%d)", key, entry.access_count)
+        return entry.data
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         """
@@ -139,28 +205,65 @@ class UnifiedCacheManager:
             ttl: TTL для этого значения (по умолчанию использует default_ttl)
         """
         with self._lock:
-            current_time = time.time()
-            
-            # Создаем новую запись
-            entry = CacheEntry(
-                data=value,
-                timestamp=current_time
-            )
-            
-            # Если ключ уже существует, обновляем
-            if key in self._cache:
-                old_entry = self._cache[key]
-                entry.access_count = old_entry.access_count
-                logger.debug(f"Cache UPDATE for key '{key}'")
-            else:
-                logger.debug(f"Cache SET for key '{key}'")
-            
-            self._cache[key] = entry
-            self._cache.move_to_end(key)  # Новые записи в конец
-            self._stats['total_sets'] += 1
+            current_time = self._now()
+            self._expire(current_time, self.EXPIRE_BATCH)
+            self._store(key, value, ttl, current_time)
             
             # Принудительная очистка при превышении размера
-            self._enforce_size_limit()
+            self._enforce_size_limit(current_time)
+            self._compact_expiry_heap()
+    
+    def bulk_set(self, items: Iterable[Tuple[str, Any]], ttl: Optional[int] = None) -> None:
+        """
+        Сохранить несколько значений в кэш за одну операцию
+        
+        Блокировка, чтение часов и очистка по TTL выполняются один раз на пакет,
+        вытеснение - после вставки всего пакета. Итоговое содержимое кэша то же,
+        что после последовательных set() в том же порядке.
+        
+        Args:
+            items: Пары (ключ, значение)
+            ttl: TTL для всех значений пакета (по умолчанию использует default_ttl)
+        """
+        with self._lock:
+            current_time = self._now()
+            self._expire(current_time, self.EXPIRE_BATCH)
+            for key, value in items:
+                self._store(key, value, ttl, current_time)
+            
+            self._enforce_size_limit(current_time)
+            self._compact_expiry_heap()
+    
+    def _store(self, key: str, value: Any, ttl: Optional[int], current_time: float) -> None:
+        """Вставить или обновить запись без проверки лимитов (вызывается под блокировкой)"""
+        entry = self._find(key)
+        if entry is None and not self._admit(key):
+            logger.debug("Cache SET for key '%s' deferred by doorkeeper", key)
+            self._stats['admission_rejections'] += 1
+            return
+        
+        expires_at = current_time + (self.default_ttl if ttl is None else ttl)
+        size = self._estimate_entry_size(key, value)
+        
+        if entry is not None:
+            # Обновление на месте: запись остается в своем сегменте SLRU
+            self._stats['memory_usage_bytes'] -= entry.size
+            entry.data = value
+            entry.timestamp = current_time
+            entry.last_access = current_time
+            entry.size = size
+            entry.expires_at = expires_at
+            self._segment(entry).move_to_end(key)
+            logger.debug("Cache UPDATE for key '%s'", key)
+        else:
+            # Новые записи в конец probation
+            entry = self._acquire(value, current_time, size, expires_at)
+            self._probation[key] = entry
+            logger.debug("Cache SET for key '%s'", key)
+        
+        self._stats['memory_usage_bytes'] += size
+        self._stats['total_sets'] += 1
+        heapq.heappush(self._expiry_heap, (expires_at, key))
     
     def delete(self, key: str) -> bool:
         """
@@ -173,34 +276,176 @@ class UnifiedCacheManager:
             True если ключ был найден и удален
         """
         with self._lock:
-            if key in self._cache:
-                del self._cache[key]
-                logger.debug(f"Cache DELETE for key '{key}'")
+            entry = self._find(key)
+            if entry is not None:
+                self._remove(key, entry)
+                logger.debug("Cache DELETE for key '%s'", key)
                 return True
             return False
     
     def clear(self) -> None:
         """Очистить весь кэш"""
         with self._lock:
-            old_size = len(self._cache)
-            self._cache.clear()
+            old_size = self._size()
+            self._probation.clear()
+            self._protected.clear()
+            self._expiry_heap.clear()
+            self._doorkeeper.clear()
+            self._stats['memory_usage_bytes'] = 0
             logger.info(f"Cache CLEARED: removed {old_size} entries")
     
-    def _enforce_size_limit(self) -> None:
-        """Принудительное ограничение размера кэша (LRU eviction)"""
-        while len(self._cache) > self.max_size:
-            # Удаляем самый старый (least recently used) элемент
-            oldest_key = next(iter(self._cache))
-            oldest_entry = self._cache[oldest_key]
+    def _size(self) -> int:
+        """Текущее количество записей в обоих сегментах"""
+        return len(self._probation) + len(self._protected)
+    
+    def _find(self, key: str) -> Optional[CacheEntry]:
+        """Найти запись в одном из сегментов (без обновления порядка)"""
+        entry = self._protected.get(key)
+        if entry is None:
+            entry = self._probation.get(key)
+        return entry
+    
+    def _segment(self, entry: CacheEntry) -> OrderedDict:
+        """Сегмент SLRU, в котором хранится запись"""
+        return self._protected if entry.protected else self._probation
+    
+    def _admit(self, key: str) -> bool:
+        """
+        Решение о допуске нового ключа
+        
+        Пока в кэше есть место, допускается любой ключ. В заполненный кэш
+        doorkeeper пропускает ключ только при повторной попытке; первая
+        попытка лишь запоминается.
+        """
+        if self.admission == 'none' or self._size() < self.max_size:
+            return True
+        
+        doorkeeper = self._doorkeeper
+        if key in doorkeeper:
+            doorkeeper.discard(key)
+            return True
+        
+        if len(doorkeeper) >= self.max_size * self.DOORKEEPER_RATIO:
+            doorkeeper.clear()
+        doorkeeper.add(key)
+        return False
+    
+    def _acquire(self, data: Any, timestamp: float, size: int, expires_at: float) -> CacheEntry:
+        """Взять запись из freelist (или создать новую) и заполнить поля"""
+        if not self._freelist:
+            return CacheEntry(data=data, timestamp=timestamp, size=size, expires_at=expires_at)
+        entry = self._freelist.pop()
+        entry.data = data
+        entry.timestamp = timestamp
+        entry.access_count = 0
+        entry.last_access = timestamp
+        entry.size = size
+        entry.protected = False
+        entry.expires_at = expires_at
+        return entry
+    
+    def _release(self, entry: CacheEntry) -> None:
+        """Вернуть удаленную запись в freelist (без ссылки на данные)"""
+        if len(self._freelist) < self.max_size:
+            entry.data = None
+            self._freelist.append(entry)
+    
+    def _remove(self, key: str, entry: CacheEntry) -> None:
+        """Удалить запись из ее сегмента и из учета памяти"""
+        del self._segment(entry)[key]
+        self._stats['memory_usage_bytes'] -= entry.size
+        self._release(entry)
+    
+    def _touch(self, key: str, entry: CacheEntry) -> None:
+        """
+        Отметить обращение к записи
+        
+        Запись из probation переходит в protected; при переполнении protected
+        его самая старая запись возвращается в конец probation.
+        """
+        if entry.protected:
+            self._protected.move_to_end(key)
+            return
+        
+        del self._probation[key]
+        entry.protected = True
+        self._protected[key] = entry
+        
+        if len(self._protected) > self._protected_max:
+            demoted_key, demoted = self._protected.popitem(last=False)
+            demoted.protected = False
+            self._probation[demoted_key] = demoted
+    
+    def _over_limit(self) -> bool:
+        """Превышен ли лимит по числу записей или по объему памяти"""
+        if self._size() > self.max_size:
+            return True
+        return (
+            self.max_bytes is not None
+            and self._stats['memory_usage_bytes'] > self.max_bytes
+            and self._size() > 0
+        )
+    
+    def _enforce_size_limit(self, now: float) -> None:
+        """
+        Принудительное ограничение размера кэша (SLRU eviction)
+        
+        Args:
+            now: Время текущей операции (часы читаются один раз на операцию)
+        """
+        # Сначала освобождаем место устаревшими записями (порция в set()
+        # ограничена EXPIRE_BATCH), и только потом вытесняем живые по LRU
+        if self._over_limit():
+            self._expire(now)
+        
+        while self._over_limit():
+            # Удаляем самый старый элемент probation; protected - только если probation пуст
+            segment = self._probation if self._probation else self._protected
+            oldest_key, oldest_entry = segment.popitem(last=False)
             
             logger.debug(
-                f"LRU EVICTION: removing '{oldest_key}' "
-                f"(age: {time.time() - oldest_entry.timestamp:.1f}s, "
-                f"accesses: {oldest_entry.access_count})"
+                "LRU EVICTION: removing '%s' (age: %.1fs, accesses: %d)",
+                oldest_key, now - oldest_entry.timestamp, oldest_entry.access_count
             )
             
-            del self._cache[oldest_key]
+            self._stats['memory_usage_bytes'] -= oldest_entry.size
             self._stats['evictions'] += 1
+            self._release(oldest_entry)
+    
+    def _expire(self, now: float, limit: Optional[int] = None) -> int:
+        """
+        Удалить записи, срок которых истек к моменту now
+        
+        Args:
+            now: Текущее время по часам менеджера
+            limit: Максимум удаляемых записей (None - без ограничения)
+            
+        Returns:
+            Количество удаленных записей
+        """
+        heap = self._expiry_heap
+        removed = 0
+        while heap and heap[0][0] < now and (limit is None or removed < limit):
+            expires_at, key = heapq.heappop(heap)
+            entry = self._find(key)
+            # Элемент кучи устарел: ключ уже удален или перезаписан с новым сроком
+            if entry is None or entry.expires_at != expires_at:
+                continue
+            self._remove(key, entry)
+            self._stats['ttl_cleanups'] += 1
+            removed += 1
+        return removed
+    
+    def _compact_expiry_heap(self) -> None:
+        """Перестроить кучу, если устаревших элементов стало больше, чем живых записей"""
+        if len(self._expiry_heap) <= 2 * self._size() + self.EXPIRE_BATCH:
+            return
+        self._expiry_heap = [
+            (entry.expires_at, key)
+            for segment in (self._probation, self._protected)
+            for key, entry in segment.items()
+        ]
+        heapq.heapify(self._expiry_heap)
     
     def cleanup_expired(self) -> int:
         """
@@ -210,54 +455,12 @@ class UnifiedCacheManager:
             Количество удаленных записей
         """
         with self._lock:
-            current_time = time.time()
-            expired_keys = []
-            
-            for key, entry in self._cache.items():
-                if current_time - entry.timestamp > self.default_ttl:
-                    expired_keys.append(key)
-            
-            for key in expired_keys:
-                del self._cache[key]
-                self._stats['ttl_cleanups'] += 1
+            removed = self._expire(self._now())
             
-            if expired_keys:
-                logger.info(f"TTL CLEANUP: removed {len(expired_keys)} expired entries")
+            if removed:
+                logger.info(f"TTL CLEANUP: removed {removed} expired entries")
             
-            return len(expired_keys)
-    
-    async def _background_cleanup(self) -> None:
-        """Background task для автоматической очистки"""
-        logger.info(f"🔄 Background cleanup started (interval: {self.cleanup_interval}s)")
-        
-        while self._running:
-            try:
-                await asyncio.sleep(self.cleanup_interval)
-                
-                if not self._running:
-                    break
-                
-                # Выполняем очистку
-                expired_count = self.cleanup_expired()
-                
-                # Логируем статистику каждые 10 минут
-                if int(time.time()) % 600 == 0:  # Каждые 10 минут
-                    stats = self.get_stats()
-                    logger.info(
-                        f"📊 Cache Stats:\n"
-                        f"   ├─ Entries: {stats['current_size']}/{self.max_size}\n"
-                        f"   ├─ Hit ratio: {stats['hit_ratio']:.1%}\n"
-                        f"   ├─ Total cleanups: {stats['ttl_cleanups']}\n"
-                        f"   └─ Total evictions: {stats['evictions']}"
-                    )
-                
-            except asyncio.CancelledError:
-                logger.info("Background cleanup cancelled")
-                break
-            except Exception as e:
-                logger.error(f"Background cleanup error: {e}")
-                # Продолжаем работу даже при ошибках
-                await asyncio.sleep(5)
+            return removed
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -267,66 +470,63 @@ class UnifiedCacheManager:
             Словарь со статистикой
         """
         with self._lock:
-            total_requests = self._stats['hits'] + self._stats['misses']
-            hit_ratio = self._stats['hits'] / total_requests if total_requests > 0 else 0.0
+            stats = self._stats
+            size = self._size()
+            total_requests = stats['hits'] + stats['misses']
             
-            # Примерная оценка использования памяти
-            memory_usage = self._estimate_memory_usage()
+            stats['current_size'] = size
+            stats['max_size'] = self.max_size
+            stats['hit_ratio'] = stats['hits'] / total_requests if total_requests > 0 else 0.0
+            # Память поддерживается инкрементально, здесь только перевод в MB
+            stats['memory_usage_mb'] = stats['memory_usage_bytes'] / (1 << 20)
+            stats['utilization'] = size / self.max_size if self.max_size > 0 else 0.0
+            stats['max_bytes'] = self.max_bytes
+            stats['bytes_utilization'] = (
+                stats['memory_usage_bytes'] / self.max_bytes if self.max_bytes else 0.0
+            )
             
-            return {
-                'current_size': len(self._cache),
-                'max_size': self.max_size,
-                'hits': self._stats['hits'],
-                'misses': self._stats['misses'],
-                'hit_ratio': hit_ratio,
-                'evictions': self._stats['evictions'],
-                'ttl_cleanups': self._stats['ttl_cleanups'],
-                'total_sets': self._stats['total_sets'],
-                'memory_usage_bytes': memory_usage,
-                'memory_usage_mb': memory_usage / (1024 * 1024),
-                'utilization': len(self._cache) / self.max_size if self.max_size > 0 else 0.0
-            }
-    
-    def _estimate_memory_usage(self) -> int:
+            # Копия: вызывающий код сравнивает снимки до и после (clear_cache)
+            return stats.copy()
+    
+    @staticmethod
+    def _estimate_entry_size(key: str, data: Any) -> int:
         """
-        Примерная оценка использования памяти кэшем
+        Примерная оценка размера одной записи кэша
+        
+        Вызывается один раз при set(); результат хранится в CacheEntry.size,
+        поэтому get_stats() не обходит весь кэш.
         
         Returns:
             Размер в байтах (приблизительно)
         """
-        total_size = 0
+        # Размер ключа
+        size = len(key.encode('utf-8'))
         
-        for key, entry in self._cache.items():
-            # Размер ключа
-            total_size += len(key.encode('utf-8'))
-            
-            # Размер данных (примерная оценка)
-            if isinstance(entry.data, str):
-                total_size += len(entry.data.encode('utf-8'))
-            elif isinstance(entry.data, dict):
-                # Для словарей используем приблизительную оценку
-                total_size += len(str(entry.data).encode('utf-8'))
-            elif isinstance(entry.data, (int, float)):
-                total_size += 8  # Примерный размер числа
-            else:
-                total_size += 64  # Дефолтная оценка для других типов
-            
-            # Размер метаданных CacheEntry
-            total_size += 64  # timestamp, access_count, last_access
+        # Размер данных (примерная оценка)
+        if isinstance(data, str):
+            size += len(data.encode('utf-8'))
+        elif isinstance(data, dict):
+            # Для словарей используем приблизительную оценку
+            size += len(str(data).encode('utf-8'))
+        elif isinstance(data, (int, float)):
+            size += 8  # Примерный размер числа
+        else:
+            size += 64  # Дефолтная оценка для других типов
         
-        return total_size
+        # Размер метаданных CacheEntry
+        size += 64  # timestamp, access_count, last_access
+        
+        return size
     
     def has_key(self, key: str) -> bool:
         """Проверить существование ключа в кэше (без обновления LRU)"""
         with self._lock:
-            if key not in self._cache:
+            entry = self._find(key)
+            if entry is None:
                 return False
             
-            entry = self._cache[key]
-            current_time = time.time()
-            
             # Проверяем TTL без обновления статистики
-            return (current_time - entry.timestamp) <= self.default_ttl
+            return self._now() <= entry.expires_at
 
 
 # Глобальные экземпляры кэш-менеджеров для разных типов данных
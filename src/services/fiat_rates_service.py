@@ -6,8 +6,11 @@ Fiat Rates Service for Crypto Helper Bot
 
 import asyncio
 import aiohttp
+import copy
 import json
+import logging
 import traceback
+import weakref
 from typing import Dict, Optional, Tuple, Any
 from dataclasses import dataclass
 from datetime import datetime
@@ -44,16 +47,72 @@ def log_detailed_error(error_type: str, error: Exception, context: str = ""):
         'traceback': traceback.format_exc() if hasattr(error, '__traceback__') else 'No traceback available'
     }
     
-    logger.error(
-        f"🚨 {error_type} ERROR in {context}:\n"
-        f"   ├─ Type: {error_details['class']}\n"
-        f"   ├─ Message: {error_details['message']}\n"
-        f"   └─ Traceback:\n{error_details['traceback']}"
-    )
+    # Детали возвращаются всегда; многострочное сообщение собирается только
+    # если ERROR пишется в лог
+    if logger.isEnabledFor(logging.ERROR):
+        logger.error(
+            f"🚨 {error_type} ERROR in {context}:\n"
+            f"   ├─ Type: {error_details['class']}\n"
+            f"   ├─ Message: {error_details['message']}\n"
+            f"   └─ Traceback:\n{error_details['traceback']}"
+        )
     
     return error_details
 
 
+class _SharedRates(dict):
+    """
+    Неизменяемый словарь курсов
+    
+    Один объект хранится в кэше и отдается всем читателям без копирования,
+    поэтому изменяющие методы запрещены. Копии и pickle дают обычный dict.
+    """
+    
+    __slots__ = ('__weakref__',)
+    
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Cached rates are read-only; copy them before modifying")
+    
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+    
+    def __copy__(self) -> Dict[str, float]:
+        return dict(self)
+    
+    def __deepcopy__(self, memo) -> Dict[str, float]:
+        return copy.deepcopy(dict(self), memo)
+    
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+# Одинаковые наборы курсов в кэше хранятся одним объектом; запись исчезает
+# из таблицы сама, когда кэш перестает ссылаться на объект
+_shared_rates: "weakref.WeakValueDictionary[frozenset, _SharedRates]" = weakref.WeakValueDictionary()
+
+
+def _share_rates(rates: Dict[str, float]) -> _SharedRates:
+    """
+    Вернуть общий объект для набора курсов с таким же содержимым
+    
+    Ключ таблицы - само содержимое, поэтому разные наборы не вытесняют друг
+    друга. Наборы с нехэшируемыми значениями кэшируются без дедупликации.
+    """
+    if type(rates) is _SharedRates:
+        return rates
+    
+    try:
+        content_key = frozenset(rates.items())
+    except TypeError:
+        return _SharedRates(rates)
+    
+    shared = _shared_rates.get(content_key)
+    if shared is None:
+        shared = _SharedRates(rates)
+        _shared_rates[content_key] = shared
+    return shared
+
+
 class FiatRatesService:
     """Сервис для получения курсов фиатных валют через APILayer"""
     
@@ -218,6 +277,10 @@ class FiatRatesService:
                                     f"   └─ Caching: enabled"
                                 )
                                 
+                                # Отдаем тот же объект, что ляжет в кэш: тип результата
+                                # не зависит от того, было ли попадание в кэш
+                                rates = _share_rates(rates)
+                                
                                 # Кэшируем успешный результат
                                 await self._cache_rates(base_currency, rates)
                                 return rates
@@ -650,6 +713,7 @@ class FiatRatesService:
         
         if cached_rates:
             logger.debug(f"✅ Cache HIT for {base_currency} from UnifiedCacheManager")
+            # Без копии: объект в кэше только для чтения (см. _SharedRates)
             return cached_rates
         
         logger.debug(f"❌ Cache MISS for {base_currency}")
@@ -661,12 +725,15 @@ class FiatRatesService:
         РЕШЕНИЕ: Замена старого self._cache на rates_cache с ограничением размера
         """
         cache_key = f"rates_{base_currency}"
-        rates_cache.set(cache_key, rates, ttl=config.RATES_CACHE_TTL)
-        
-        logger.debug(
-            f"💾 Cached rates for {base_currency} (TTL: {config.RATES_CACHE_TTL}s, "
-            f"Cache size: {rates_cache.get_stats()['current_size']}/{rates_cache.max_size})"
-        )
+        rates_cache.set(cache_key, _share_rates(rates), ttl=config.RATES_CACHE_TTL)
+        
+        # Снимок статистики кэша нужен только для debug сообщения
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "💾 Cached rates for %s (TTL: %ss, Cache size: %d/%d)",
+                base_currency, config.RATES_CACHE_TTL,
+                rates_cache.get_stats()['current_size'], rates_cache.max_size
+            )
     
     async def _get_fallback_rates(self, base_currency: str) -> Dict[str, float]:
         """
@@ -11,6 +11,7 @@ from typing import Dict, List, Optional, Set
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from decimal import Decimal
+from functools import lru_cache
 
 try:
     from ..config import config
@@ -30,6 +31,17 @@ except ImportError:
 logger = get_api_logger()
 
 
+@lru_cache(maxsize=256)
+def _parse_rate_timestamp(timestamp: str) -> datetime:
+    """
+    Разобрать ISO метку времени курса (без tzinfo)
+    
+    Курс из кэша проверяется на свежесть в каждом цикле предзагрузки с той же
+    меткой времени, поэтому результат разбора кэшируется по строке.
+    """
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).replace(tzinfo=None)
+
+
 @dataclass
 class PreloadConfig:
     """Конфигурация предзагрузки"""
@@ -95,6 +107,9 @@ class SmartRatePreloader:
         self.min_interval = 30  # Минимальный интервал
         self.max_interval = 600  # Максимальный интервал
         
+        # Тайм-аут загрузки одной пары (секунды)
+        self.pair_timeout = 3.0
+        
         logger.info(
             f"🧠 Smart Rate Preloader initialized\n"
             f"   ├─ Categories: {len(self.preload_configs)}\n"
@@ -244,7 +259,7 @@ class SmartRatePreloader:
             # Загружаем новый курс с коротким тайм-аутом
             rate = await asyncio.wait_for(
                 self.unified_manager.get_exchange_rate(pair, use_cache=False),
-                timeout=3.0
+                timeout=self.pair_timeout
             )
             
             if rate:
@@ -269,8 +284,7 @@ class SmartRatePreloader:
             return False
         
         try:
-            rate_time = datetime.fromisoformat(rate.timestamp.replace('Z', '+00:00'))
-            age = (datetime.now() - rate_time.replace(tzinfo=None)).total_seconds()
+            age = (datetime.now() - _parse_rate_timestamp(rate.timestamp)).total_seconds()
             
             # Критические курсы должны быть свежее
             if category == 'critical':
@@ -9,10 +9,6 @@ from decimal import Decimal
 from unittest.mock import Mock, AsyncMock, patch
 
 # Импорты тестируемых модулей
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
-
 from handlers.fsm_states import (
     Currency, get_available_targets, is_valid_pair
 )
@@ -115,6 +111,8 @@ class TestNewCurrencies:
 class TestNewCurrencyFormatting:
     """Тестирование форматирования сообщений с новыми валютами"""
     
+    pytestmark = pytest.mark.formatting
+    
     def test_source_selected_message_formatting(self):
         """Тест форматирования сообщения выбора исходной валюты RUB"""
         message = MessageFormatter.format_source_selected_message(Currency.RUB)
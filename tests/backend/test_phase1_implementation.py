@@ -9,10 +9,6 @@ from decimal import Decimal
 from unittest.mock import Mock, AsyncMock
 
 # Импорты тестируемых модулей
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
-
 from handlers.fsm_states import (
     ExchangeFlow, Currency, 
     get_available_targets, is_valid_pair,
@@ -345,6 +341,8 @@ class TestKeyboards:
 class TestFormatters:
     """Тестирование модуля форматеров"""
     
+    pytestmark = pytest.mark.formatting
+    
     def test_format_welcome_message(self):
         """Тест форматирования приветственного сообщения"""
         message = MessageFormatter.format_welcome_message()
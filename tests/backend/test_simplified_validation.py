@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Unit тесты для упрощенной валидации (TASK-12)
+Тестирование InputValidator: суммы и процентные наценки
+"""
+
+import pytest
+from decimal import Decimal
+
+# Импорты тестируемых модулей
+from handlers.validation import InputValidator, ValidationError
+
+
+# (ввод, ожидаемое значение, фрагмент текста ошибки)
+AMOUNT_CASES = [
+    ("1000", Decimal("1000"), None),
+    ("500.50", Decimal("500.50"), None),
+    ("  1000  ", Decimal("1000"), None),
+    ("0", None, "больше нуля"),
+    ("-100", None, "больше нуля"),
+    ("2000000000", None, "слишком большая"),
+    ("abc", None, "числовое значение"),
+    ("", None, "числовое значение"),
+]
+
+MARGIN_CASES = [
+    ("5", Decimal("5"), None),
+    ("-1.2", Decimal("-1.2"), None),
+    ("0", Decimal("0"), None),
+    ("2.5%", Decimal("2.5"), None),
+    ("  10  ", Decimal("10"), None),
+    ("-150", None, "меньше -100%"),
+    ("1500", None, "больше 1000%"),
+    ("abc", None, "числовое значение"),
+    ("", None, "числовое значение"),
+]
+
+
+class TestSimplifiedValidation:
+    """Тестирование упрощенной валидации ввода"""
+
+    @pytest.mark.parametrize("raw,expected,err", AMOUNT_CASES)
+    def test_validate_amount(self, raw, expected, err):
+        """Тест валидации суммы"""
+        if err is None:
+            assert InputValidator.validate_amount(raw) == expected
+        else:
+            with pytest.raises(ValidationError, match=err):
+                InputValidator.validate_amount(raw)
+
+    @pytest.mark.parametrize("raw,expected,err", MARGIN_CASES)
+    def test_validate_margin(self, raw, expected, err):
+        """Тест валидации процентной наценки"""
+        if err is None:
+            assert InputValidator.validate_margin(raw) == expected
+        else:
+            with pytest.raises(ValidationError, match=err):
+                InputValidator.validate_margin(raw)
+
+
+if __name__ == "__main__":
+    # Запуск тестов
+    pytest.main([__file__, "-v"])
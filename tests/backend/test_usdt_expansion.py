@@ -9,10 +9,6 @@ from decimal import Decimal
 from unittest.mock import Mock, AsyncMock, patch
 
 # Импорты тестируемых модулей
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
-
 from handlers.fsm_states import (
     Currency, get_available_targets, is_valid_pair
 )
@@ -20,6 +16,33 @@ from handlers.keyboards import create_target_currency_keyboard
 from handlers.formatters import MessageFormatter
 
 
+# callback_data → (код валюты, название) для целевых валют USDT
+EXPECTED_USDT_TARGETS = {
+    "target_RUB": ("RUB", "Рубли"),
+    "target_USD": ("USD", "Доллары"),
+    "target_EUR": ("EUR", "Евро"),
+    "target_THB": ("THB", "Тайский бат"),
+    "target_AED": ("AED", "Дирхам ОАЭ"),
+    "target_ZAR": ("ZAR", "Рэнд ЮАР"),
+    "target_IDR": ("IDR", "Рупия"),
+}
+
+
+def _flatten(keyboard):
+    """Свести inline-клавиатуру к словарю {callback_data: text}"""
+    return {b.callback_data: b.text for row in keyboard.inline_keyboard for b in row}
+
+
+@pytest.fixture
+def usdt_keyboard():
+    """Клавиатура целевых валют для USDT"""
+    return create_target_currency_keyboard(Currency.USDT)
+
+
+# Прямая ссылка на метод форматирования курса (без поиска атрибута в каждом тесте)
+_format_rate = MessageFormatter._format_rate_for_pair
+
+
 class TestUSDTExpansion:
     """Тестирование расширенной поддержки USDT"""
     
@@ -63,122 +86,69 @@ class TestUSDTExpansion:
         assert is_valid_pair(Currency.EUR, Currency.USDT) == False
         assert is_valid_pair(Currency.THB, Currency.USDT) == False
     
-    def test_usdt_keyboard_display(self):
+    def test_usdt_keyboard_display(self, usdt_keyboard):
         """Тест отображения новых валют в клавиатуре для USDT"""
-        keyboard = create_target_currency_keyboard(Currency.USDT)
+        labels = _flatten(usdt_keyboard)
         
-        # Собираем весь текст кнопок
-        buttons_text = []
-        for row in keyboard.inline_keyboard:
-            for button in row:
-                buttons_text.append(button.text)
-        
-        # Проверяем наличие всех валют
-        assert any("RUB" in text and "Рубли" in text for text in buttons_text)
-        assert any("USD" in text and "Доллары" in text for text in buttons_text)
-        assert any("EUR" in text and "Евро" in text for text in buttons_text)
-        assert any("THB" in text and "Тайский бат" in text for text in buttons_text)
-        assert any("AED" in text and "Дирхам ОАЭ" in text for text in buttons_text)
-        assert any("ZAR" in text and "Рэнд ЮАР" in text for text in buttons_text)
-        assert any("IDR" in text and "Рупия" in text for text in buttons_text)
+        # Проверяем наличие всех валют: код и название на своей кнопке
+        for callback, (code, name) in EXPECTED_USDT_TARGETS.items():
+            assert callback in labels
+            assert code in labels[callback] and name in labels[callback]
     
-    def test_usdt_callback_data(self):
+    def test_usdt_callback_data(self, usdt_keyboard):
         """Тест callback данных для новых пар USDT"""
-        keyboard = create_target_currency_keyboard(Currency.USDT)
-        
-        # Собираем все callback_data
-        callbacks = []
-        for row in keyboard.inline_keyboard:
-            for button in row:
-                if button.callback_data and button.callback_data.startswith('target_'):
-                    callbacks.append(button.callback_data)
+        labels = _flatten(usdt_keyboard)
         
         # Проверяем наличие callback данных для всех валют
-        assert "target_RUB" in callbacks
-        assert "target_USD" in callbacks
-        assert "target_EUR" in callbacks
-        assert "target_THB" in callbacks
-        assert "target_AED" in callbacks
-        assert "target_ZAR" in callbacks
-        assert "target_IDR" in callbacks
+        assert set(EXPECTED_USDT_TARGETS) <= labels.keys()
 
 
 class TestUSDTFormatting:
     """Тестирование форматирования сообщений с USDT"""
     
-    def test_usdt_rate_formatting(self):
-        """Тест форматирования курсов USDT к новым валютам"""
-        # USDT → USD
-        rate_text = MessageFormatter._format_rate_for_pair(Currency.USDT, Currency.USD, Decimal("1.02"))
-        assert rate_text == "<b>1 USDT = 1,02 USD</b>"
-        
-        # USDT → EUR
-        rate_text = MessageFormatter._format_rate_for_pair(Currency.USDT, Currency.EUR, Decimal("0.95"))
-        assert rate_text == "<b>1 USDT = 0,95 EUR</b>"
-        
-        # USDT → THB
-        rate_text = MessageFormatter._format_rate_for_pair(Currency.USDT, Currency.THB, Decimal("35.50"))
-        assert rate_text == "<b>1 USDT = 35,50 THB</b>"
-        
-        # USDT → AED
-        rate_text = MessageFormatter._format_rate_for_pair(Currency.USDT, Currency.AED, Decimal("3.67"))
-        assert rate_text == "<b>1 USDT = 3,67 AED</b>"
-        
-        # USDT → ZAR
-        rate_text = MessageFormatter._format_rate_for_pair(Currency.USDT, Currency.ZAR, Decimal("18.50"))
-        assert rate_text == "<b>1 USDT = 18,50 ZAR</b>"
-        
-        # USDT → IDR
-        rate_text = MessageFormatter._format_rate_for_pair(Currency.USDT, Currency.IDR, Decimal("15650.00"))
-        assert rate_text == "<b>1 USDT = 15650,00 IDR</b>"
-        
+    pytestmark = pytest.mark.formatting
+    
+    @pytest.mark.parametrize("target,rate,expected", [
+        (Currency.USD, Decimal("1.02"), "<b>1 USDT = 1,02 USD</b>"),
+        (Currency.EUR, Decimal("0.95"), "<b>1 USDT = 0,95 EUR</b>"),
+        (Currency.THB, Decimal("35.50"), "<b>1 USDT = 35,50 THB</b>"),
+        (Currency.AED, Decimal("3.67"), "<b>1 USDT = 3,67 AED</b>"),
+        (Currency.ZAR, Decimal("18.50"), "<b>1 USDT = 18,50 ZAR</b>"),
+        (Currency.IDR, Decimal("15650.00"), "<b>1 USDT = 15650,00 IDR</b>"),
         # USDT → RUB (старая пара, должна остаться такой же)
-        rate_text = MessageFormatter._format_rate_for_pair(Currency.USDT, Currency.RUB, Decimal("100.15"))
-        assert rate_text == "<b>1 USDT = 100,15 RUB</b>"
+        (Currency.RUB, Decimal("100.15"), "<b>1 USDT = 100,15 RUB</b>"),
+    ])
+    def test_usdt_rate_formatting(self, target, rate, expected):
+        """Тест форматирования курсов USDT к новым валютам"""
+        assert _format_rate(Currency.USDT, target, rate) == expected
     
-    def test_usdt_target_selected_messages(self):
+    @pytest.mark.parametrize("target,rate,rate_text", [
+        (Currency.USD, Decimal("1.02"), "1 USDT = 1,02 USD"),
+        (Currency.EUR, Decimal("0.95"), "1 USDT = 0,95 EUR"),
+        (Currency.THB, Decimal("35.50"), "1 USDT = 35,50 THB"),
+    ])
+    def test_usdt_target_selected_messages(self, target, rate, rate_text):
         """Тест форматирования сообщений выбора целевой валюты с USDT"""
-        # USDT → USD
-        message = MessageFormatter.format_target_selected_message(
-            Currency.USDT, Currency.USD, Decimal("1.02")
-        )
-        assert "USDT → USD" in message
-        assert "1 USDT = 1,02 USD" in message
-        
-        # USDT → EUR
         message = MessageFormatter.format_target_selected_message(
-            Currency.USDT, Currency.EUR, Decimal("0.95")
+            Currency.USDT, target, rate
         )
-        assert "USDT → EUR" in message
-        assert "1 USDT = 0,95 EUR" in message
-        
-        # USDT → THB
-        message = MessageFormatter.format_target_selected_message(
-            Currency.USDT, Currency.THB, Decimal("35.50")
-        )
-        assert "USDT → THB" in message
-        assert "1 USDT = 35,50 THB" in message
+        assert f"USDT → {target.value}" in message
+        assert rate_text in message
     
-    def test_usdt_final_result_messages(self):
+    @pytest.mark.parametrize("target,amount,margin,final_rate,result,fragments", [
+        (Currency.USD, Decimal("100"), Decimal("2"), Decimal("1.00"), Decimal("98.00"),
+         ("100 USDT", "98.00 USD", "1 USDT = 1,00 USD")),
+        (Currency.EUR, Decimal("50"), Decimal("1.5"), Decimal("0.936"), Decimal("46.80"),
+         ("50 USDT", "46.80 EUR")),
+    ])
+    def test_usdt_final_result_messages(self, target, amount, margin, final_rate, result, fragments):
         """Тест форматирования финального результата с USDT"""
-        # USDT → USD
-        message = MessageFormatter.format_final_result(
-            Currency.USDT, Currency.USD,
-            Decimal("100"), Decimal("2"), Decimal("1.00"), Decimal("98.00")
-        )
-        assert "USDT → USD" in message
-        assert "100 USDT" in message
-        assert "98.00 USD" in message
-        assert "1 USDT = 1,00 USD" in message
-        
-        # USDT → EUR
         message = MessageFormatter.format_final_result(
-            Currency.USDT, Currency.EUR,
-            Decimal("50"), Decimal("1.5"), Decimal("0.936"), Decimal("46.80")
+            Currency.USDT, target, amount, margin, final_rate, result
         )
-        assert "USDT → EUR" in message
-        assert "50 USDT" in message
-        assert "46.80 EUR" in message
+        assert f"USDT → {target.value}" in message
+        for fragment in fragments:
+            assert fragment in message
 
 
 class TestUSDTAPIIntegration:
@@ -196,45 +166,32 @@ class TestUSDTAPIIntegration:
         import asyncio
         assert asyncio.iscoroutinefunction(ExchangeCalculator.get_usdt_to_fiat_rate)
     
-    @pytest.mark.asyncio 
-    @patch('handlers.admin_flow.ExchangeCalculator.get_usdt_rub_rate')
-    @patch('handlers.admin_flow.ExchangeCalculator.get_usd_rub_rate')
-    async def test_usdt_to_usd_cross_rate(self, mock_usd_rub, mock_usdt_rub):
-        """Тест кросс-конвертации USDT → USD"""
+    @pytest.mark.parametrize("target,usdt_rub,fiat_rub,fiat_method", [
+        # USDT/USD = USDT/RUB ÷ USD/RUB = 100 ÷ 98 ≈ 1.0204
+        (Currency.USD, "100.00", "98.00", "get_usd_rub_rate"),
+        # USDT/EUR = USDT/RUB ÷ EUR/RUB = 100 ÷ 110 ≈ 0.909091
+        (Currency.EUR, "100.00", "110.00", "get_eur_rub_rate"),
+    ])
+    @pytest.mark.asyncio
+    async def test_usdt_to_fiat_cross_rate(self, monkeypatch, target, usdt_rub, fiat_rub, fiat_method):
+        """Тест кросс-конвертации USDT → USD/EUR"""
         from handlers.admin_flow import ExchangeCalculator
         
-        # Настраиваем mock'и: USDT/RUB = 100, USD/RUB = 98
-        mock_usdt_rub.return_value = Decimal("100.00")
-        mock_usd_rub.return_value = Decimal("98.00")
+        # Настраиваем mock'и курсов к рублю
+        mock_usdt_rub = AsyncMock(return_value=Decimal(usdt_rub))
+        mock_fiat_rub = AsyncMock(return_value=Decimal(fiat_rub))
+        monkeypatch.setattr(ExchangeCalculator, "get_usdt_rub_rate", mock_usdt_rub)
+        monkeypatch.setattr(ExchangeCalculator, fiat_method, mock_fiat_rub)
         
         # Тестируем кросс-курс
-        cross_rate = await ExchangeCalculator.get_usdt_to_fiat_rate(Currency.USD)
+        cross_rate = await ExchangeCalculator.get_usdt_to_fiat_rate(target)
         
-        # USDT/USD = USDT/RUB ÷ USD/RUB = 100 ÷ 98 ≈ 1.0204
-        expected = Decimal("100.00") / Decimal("98.00")
+        expected = Decimal(usdt_rub) / Decimal(fiat_rub)
         assert cross_rate == expected.quantize(Decimal('0.000001'))
         
         # Проверяем, что методы были вызваны
         mock_usdt_rub.assert_called_once()
-        mock_usd_rub.assert_called_once()
-    
-    @pytest.mark.asyncio 
-    @patch('handlers.admin_flow.ExchangeCalculator.get_usdt_rub_rate')
-    @patch('handlers.admin_flow.ExchangeCalculator.get_eur_rub_rate')
-    async def test_usdt_to_eur_cross_rate(self, mock_eur_rub, mock_usdt_rub):
-        """Тест кросс-конвертации USDT → EUR"""
-        from handlers.admin_flow import ExchangeCalculator
-        
-        # Настраиваем mock'и: USDT/RUB = 100, EUR/RUB = 110
-        mock_usdt_rub.return_value = Decimal("100.00")
-        mock_eur_rub.return_value = Decimal("110.00")
-        
-        # Тестируем кросс-курс
-        cross_rate = await ExchangeCalculator.get_usdt_to_fiat_rate(Currency.EUR)
-        
-        # USDT/EUR = USDT/RUB ÷ EUR/RUB = 100 ÷ 110 ≈ 0.909091
-        expected = Decimal("100.00") / Decimal("110.00")
-        assert cross_rate == expected.quantize(Decimal('0.000001'))
+        mock_fiat_rub.assert_called_once()
     
     @pytest.mark.asyncio 
     @patch('handlers.admin_flow.ExchangeCalculator.get_usdt_to_fiat_rate')
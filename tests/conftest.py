@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Общая настройка pytest для тестов Crypto Helper Bot
+Пути импорта (корень проекта и src) задаются в pytest.ini через pythonpath
+"""
+
+import asyncio
+
+import pytest
+
+try:
+    import uvloop
+except ImportError:
+    # uvloop опционален (нет сборки под Windows): используем стандартный loop
+    uvloop = None
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    """Один event loop на всю сессию вместо нового loop для каждого async теста"""
+    loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+    yield loop
+    
+    # Задачи, пережившие свои тесты, отменяются до закрытия общего loop
+    pending = [task for task in asyncio.all_tasks(loop) if not task.done()]
+    for task in pending:
+        task.cancel()
+    if pending:
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+    loop.run_until_complete(loop.shutdown_asyncgens())
+    loop.close()
+
+
+class FakeClock:
+    """Управляемые часы для тестов TTL: время идет только через advance()"""
+    
+    __slots__ = ('now',)
+    
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+    
+    def __call__(self) -> float:
+        return self.now
+    
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def fake_clock():
+    """Фейковые часы для UnifiedCacheManager(time_source=...)"""
+    return FakeClock()
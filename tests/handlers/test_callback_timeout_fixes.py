@@ -6,21 +6,84 @@ Unit тесты для исправлений callback timeout (TASK-CRYPTO-002)
 
 import pytest
 import asyncio
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, call
 from decimal import Decimal
 
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
-
 from aiogram.types import Message, CallbackQuery, User, Chat, InlineKeyboardMarkup
 from aiogram.exceptions import TelegramBadRequest
 
 from handlers.formatters import SafeMessageEditor, LoadingMessageFormatter
+from handlers import admin_flow
 from handlers.admin_flow import get_exchange_rate_with_loading, safe_callback_answer_and_edit
 from handlers.fsm_states import Currency
 from config import config
 
+# Списки атрибутов для spec вычисляются один раз: spec=<класс> заново
+# интроспектирует pydantic-модель aiogram при создании каждого mock.
+# Поля модели добавляются явно, чтобы mock'и можно было создавать со spec_set
+_MESSAGE_SPEC = sorted(set(dir(Message)) | set(Message.model_fields))
+_CALLBACK_SPEC = sorted(set(dir(CallbackQuery)) | set(CallbackQuery.model_fields))
+_USER_SPEC = sorted(set(dir(User)) | set(User.model_fields))
+
+# Снимок настроек таймаутов: читаются из config один раз при импорте модуля
+_CFG = {
+    key: getattr(config, key)
+    for key in (
+        'CALLBACK_API_TIMEOUT',
+        'CALLBACK_ANSWER_TIMEOUT',
+        'MAX_MESSAGE_EDIT_ATTEMPTS',
+        'API_TIMEOUT',
+    )
+    if hasattr(config, key)
+}
+
+# Ошибки Telegram создаются заново в каждом тесте: у поднятого исключения
+# накапливаются __traceback__ и __context__, общий экземпляр переносил бы их
+def _err_not_modified():
+    return TelegramBadRequest(
+        method="editMessageText",
+        message="Bad Request: message is not modified"
+    )
+
+
+def _err_generic():
+    return TelegramBadRequest(method="editMessageText", message="Bad request")
+
+
+def _err_old_query():
+    return TelegramBadRequest(
+        method="answerCallbackQuery",
+        message="Bad Request: query is too old and response timeout expired"
+    )
+
+
+async def _noop_sleep(_delay):
+    """Пауза между попытками без реального ожидания"""
+
+
+class FastAsyncMock:
+    """
+    Легковесная замена AsyncMock для подмены корутин-методов
+    
+    Без дочерних mock'ов и spec-интроспекции: хранит только вызовы
+    и возвращает return_value. Для side_effect используется AsyncMock.
+    """
+    
+    __slots__ = ("return_value", "call_count", "call_args_list")
+    
+    def __init__(self, return_value=None):
+        self.return_value = return_value
+        self.call_count = 0
+        self.call_args_list = []
+    
+    async def __call__(self, *args, **kwargs):
+        self.call_count += 1
+        self.call_args_list.append(call(*args, **kwargs))
+        return self.return_value
+    
+    def assert_called_once(self):
+        assert self.call_count == 1, f"Ожидался 1 вызов, было {self.call_count}"
+
 
 class TestSafeMessageEditor:
     """Тесты для SafeMessageEditor - исправление ошибок редактирования сообщений"""
@@ -28,7 +91,7 @@ class TestSafeMessageEditor:
     @pytest.fixture
     def mock_message(self):
         """Создать mock Message объект"""
-        message = MagicMock(spec=Message)
+        message = MagicMock(spec_set=_MESSAGE_SPEC)
         message.text = "Test message"
         message.caption = None
         message.reply_markup = None
@@ -38,9 +101,9 @@ class TestSafeMessageEditor:
     @pytest.fixture
     def mock_callback_query(self):
         """Создать mock CallbackQuery объект"""
-        callback = MagicMock(spec=CallbackQuery)
+        callback = MagicMock(spec_set=_CALLBACK_SPEC)
         callback.answer = AsyncMock()
-        callback.from_user = MagicMock(spec=User)
+        callback.from_user = MagicMock(spec_set=_USER_SPEC)
         callback.from_user.id = 123456
         return callback
     
@@ -69,10 +132,7 @@ class TestSafeMessageEditor:
         new_text = "New message text"
         
         # Настраиваем mock для ошибки "message is not modified"
-        mock_message.edit_text.side_effect = TelegramBadRequest(
-            method="editMessageText",
-            message="Bad Request: message is not modified"
-        )
+        mock_message.edit_text.side_effect = _err_not_modified()
         
         result = await SafeMessageEditor.safe_edit_message(
             mock_message, new_text
@@ -87,18 +147,21 @@ class TestSafeMessageEditor:
         new_text = "New message text"
         
         # Первая попытка - ошибка, вторая - успех
-        mock_message.edit_text.side_effect = [
-            TelegramBadRequest(method="editMessageText", message="Bad request"),
-            None
-        ]
+        calls = [0]
+        
+        async def edit_text(*args, **kwargs):
+            calls[0] += 1
+            if calls[0] == 1:
+                raise _err_generic()
         
-        with patch('asyncio.sleep', new_callable=AsyncMock):
-            result = await SafeMessageEditor.safe_edit_message(
-                mock_message, new_text, max_attempts=2
-            )
+        mock_message.edit_text = edit_text
+        
+        result = await SafeMessageEditor.safe_edit_message(
+            mock_message, new_text, max_attempts=2, _sleep=_noop_sleep
+        )
         
         assert result is True
-        assert mock_message.edit_text.call_count == 2
+        assert calls[0] == 2
     
     @pytest.mark.asyncio
     async def test_safe_edit_message_max_attempts_exceeded(self, mock_message):
@@ -106,15 +169,11 @@ class TestSafeMessageEditor:
         new_text = "New message text"
         
         # Все попытки неудачны
-        mock_message.edit_text.side_effect = TelegramBadRequest(
-            method="editMessageText", 
-            message="Bad request"
-        )
+        mock_message.edit_text.side_effect = _err_generic()
         
-        with patch('asyncio.sleep', new_callable=AsyncMock):
-            result = await SafeMessageEditor.safe_edit_message(
-                mock_message, new_text, max_attempts=2
-            )
+        result = await SafeMessageEditor.safe_edit_message(
+            mock_message, new_text, max_attempts=2, _sleep=_noop_sleep
+        )
         
         assert result is False
         assert mock_message.edit_text.call_count == 2
@@ -141,13 +200,15 @@ class TestSafeMessageEditor:
         """Тест обработки таймаута при ответе на callback"""
         text = "Test message"
         
-        # Настраиваем mock для таймаута
-        mock_callback_query.answer.side_effect = asyncio.TimeoutError()
+        # Настраиваем mock: ответ дольше таймаута
+        async def slow_answer(**kwargs):
+            await asyncio.sleep(1.0)
+        
+        mock_callback_query.answer.side_effect = slow_answer
         
-        with patch('asyncio.wait_for', side_effect=asyncio.TimeoutError()):
-            result = await SafeMessageEditor.safe_answer_callback(
-                mock_callback_query, text, timeout=1.0
-            )
+        result = await SafeMessageEditor.safe_answer_callback(
+            mock_callback_query, text, timeout=0.01
+        )
         
         assert result is False
     
@@ -157,10 +218,7 @@ class TestSafeMessageEditor:
         text = "Test message"
         
         # Настраиваем mock для старого query
-        mock_callback_query.answer.side_effect = TelegramBadRequest(
-            method="answerCallbackQuery",
-            message="Bad Request: query is too old and response timeout expired"
-        )
+        mock_callback_query.answer.side_effect = _err_old_query()
         
         result = await SafeMessageEditor.safe_answer_callback(
             mock_callback_query, text
@@ -172,55 +230,33 @@ class TestSafeMessageEditor:
 class TestLoadingMessageFormatter:
     """Тесты для LoadingMessageFormatter - форматирование загрузочных сообщений"""
     
-    def test_format_loading_message(self):
-        """Тест форматирования общего сообщения загрузки"""
-        result = LoadingMessageFormatter.format_loading_message(
-            "Тестовая операция", 2, 5
-        )
-        
-        assert "⏳" in result
-        assert "Тестовая операция" in result
-        assert "2/5" in result
-        assert "Пожалуйста, подождите" in result
+    pytestmark = pytest.mark.formatting
     
-    def test_format_api_loading_message(self):
-        """Тест форматирования сообщения загрузки API"""
-        result = LoadingMessageFormatter.format_api_loading_message("Rapira API")
-        
-        assert "🔄" in result
-        assert "Rapira API" in result
-        assert "запрос к серверу" in result
-        assert "несколько секунд" in result
-    
-    def test_format_calculation_loading_message(self):
-        """Тест форматирования сообщения расчета"""
-        result = LoadingMessageFormatter.format_calculation_loading_message()
-        
-        assert "🧮" in result
-        assert "Расчет курса" in result
-        assert "наценки" in result
-        assert "Секундочку" in result
-    
-    def test_format_error_with_retry(self):
-        """Тест форматирования ошибки с повторными попытками"""
-        result = LoadingMessageFormatter.format_error_with_retry(
-            "Тестовая ошибка", 2, 3
-        )
-        
-        assert "⚠️" in result
-        assert "попытка 2/3" in result
-        assert "Тестовая ошибка" in result
-        assert "Повторная попытка" in result
-    
-    def test_create_progress_bar(self):
-        """Тест создания прогресс-бара"""
-        # Тестируем приватный метод через публичный
-        result = LoadingMessageFormatter._create_progress_bar(3, 10, 10)
-        
-        assert "[" in result
-        assert "]" in result
-        assert "█" in result  # Заполненная часть
-        assert "░" in result  # Незаполненная часть
+    @pytest.mark.parametrize("formatter,args,expected_substrings", [
+        (LoadingMessageFormatter.format_loading_message, ("Тестовая операция", 2, 5),
+         ["⏳", "Тестовая операция", "2/5", "Пожалуйста, подождите"]),
+        (LoadingMessageFormatter.format_api_loading_message, ("Rapira API",),
+         ["🔄", "Rapira API", "запрос к серверу", "несколько секунд"]),
+        (LoadingMessageFormatter.format_calculation_loading_message, (),
+         ["🧮", "Расчет курса", "наценки", "Секундочку"]),
+        (LoadingMessageFormatter.format_error_with_retry, ("Тестовая ошибка", 2, 3),
+         ["⚠️", "попытка 2/3", "Тестовая ошибка", "Повторная попытка"]),
+        # Прогресс-бар: скобки, заполненная и незаполненная части
+        (LoadingMessageFormatter._create_progress_bar, (3, 10, 10),
+         ["[", "]", "█", "░"]),
+    ], ids=[
+        "loading_message",
+        "api_loading_message",
+        "calculation_loading_message",
+        "error_with_retry",
+        "progress_bar",
+    ])
+    def test_loading_formatter(self, formatter, args, expected_substrings):
+        """Тест форматирования загрузочных сообщений"""
+        result = formatter(*args)
+        
+        missing = {s for s in expected_substrings if s not in result}
+        assert not missing, f"missing tokens: {missing}"
 
 
 class TestAsyncAPIHandlers:
@@ -229,7 +265,7 @@ class TestAsyncAPIHandlers:
     @pytest.fixture
     def mock_message(self):
         """Создать mock Message объект"""
-        message = MagicMock(spec=Message)
+        message = MagicMock(spec_set=_MESSAGE_SPEC)
         message.text = "Test message"
         message.edit_text = AsyncMock()
         return message
@@ -237,103 +273,105 @@ class TestAsyncAPIHandlers:
     @pytest.fixture
     def mock_callback_query(self, mock_message):
         """Создать mock CallbackQuery объект"""
-        callback = MagicMock(spec=CallbackQuery)
+        callback = MagicMock(spec_set=_CALLBACK_SPEC)
         callback.answer = AsyncMock()
         callback.message = mock_message
-        callback.from_user = MagicMock(spec=User)
+        callback.from_user = MagicMock(spec_set=_USER_SPEC)
         callback.from_user.id = 123456
         return callback
     
+    @pytest.fixture
+    def mock_edit(self, monkeypatch):
+        """Замокать SafeMessageEditor.safe_edit_message (успешное редактирование)"""
+        mock = FastAsyncMock(return_value=True)
+        monkeypatch.setattr(admin_flow.SafeMessageEditor, "safe_edit_message", mock)
+        return mock
+    
+    @pytest.fixture
+    def mock_answer(self, monkeypatch):
+        """Замокать SafeMessageEditor.safe_answer_callback (успешный ответ)"""
+        mock = FastAsyncMock(return_value=True)
+        monkeypatch.setattr(admin_flow.SafeMessageEditor, "safe_answer_callback", mock)
+        return mock
+    
     @pytest.mark.asyncio
-    async def test_get_exchange_rate_with_loading_success(self, mock_message):
+    async def test_get_exchange_rate_with_loading_success(self, monkeypatch, mock_message, mock_edit):
         """Тест успешного получения курса с загрузкой"""
         source_currency = Currency.RUB
         target_currency = Currency.USDT
         expected_rate = Decimal('100.50')
         
-        # Мокаем SafeMessageEditor.safe_edit_message
-        with patch('handlers.admin_flow.SafeMessageEditor.safe_edit_message', new_callable=AsyncMock) as mock_edit:
-            mock_edit.return_value = True
-            
-            # Мокаем ExchangeCalculator.get_base_rate_for_pair
-            with patch('handlers.admin_flow.ExchangeCalculator.get_base_rate_for_pair', new_callable=AsyncMock) as mock_get_rate:
-                mock_get_rate.return_value = expected_rate
-                
-                result = await get_exchange_rate_with_loading(
-                    mock_message, source_currency, target_currency
-                )
+        # Мокаем ExchangeCalculator.get_base_rate_for_pair
+        mock_get_rate = AsyncMock(return_value=expected_rate)
+        monkeypatch.setattr(admin_flow.ExchangeCalculator, "get_base_rate_for_pair", mock_get_rate)
+        
+        result = await get_exchange_rate_with_loading(
+            mock_message, source_currency, target_currency
+        )
         
         assert result == expected_rate
         assert mock_edit.call_count >= 1  # Должно быть вызвано для показа загрузки
         mock_get_rate.assert_called_once_with(source_currency, target_currency)
     
     @pytest.mark.asyncio
-    async def test_get_exchange_rate_with_loading_timeout(self, mock_message):
+    async def test_get_exchange_rate_with_loading_timeout(self, monkeypatch, mock_message, mock_edit):
         """Тест обработки таймаута API"""
         source_currency = Currency.RUB
         target_currency = Currency.USD
         
-        with patch('handlers.admin_flow.SafeMessageEditor.safe_edit_message', new_callable=AsyncMock) as mock_edit:
-            mock_edit.return_value = True
-            
-            # Мокаем UserFriendlyErrorFormatter
-            with patch('handlers.admin_flow.UserFriendlyErrorFormatter.format_api_timeout_error') as mock_format_error:
-                mock_format_error.return_value = "⚠️ Ошибка таймаута APILayer"
-                
-                # Мокаем таймаут
-                with patch('handlers.admin_flow.ExchangeCalculator.get_base_rate_for_pair', new_callable=AsyncMock) as mock_get_rate:
-                    mock_get_rate.side_effect = asyncio.TimeoutError()
-                    
-                    with patch('asyncio.wait_for', side_effect=asyncio.TimeoutError()):
-                        result = await get_exchange_rate_with_loading(
-                            mock_message, source_currency, target_currency
-                        )
+        # Мокаем UserFriendlyErrorFormatter
+        mock_format_error = MagicMock(return_value="⚠️ Ошибка таймаута APILayer")
+        monkeypatch.setattr(
+            admin_flow.UserFriendlyErrorFormatter, "format_api_timeout_error", mock_format_error
+        )
+        
+        # Мокаем таймаут
+        monkeypatch.setattr(
+            admin_flow.ExchangeCalculator, "get_base_rate_for_pair",
+            AsyncMock(side_effect=asyncio.TimeoutError())
+        )
+        
+        result = await get_exchange_rate_with_loading(
+            mock_message, source_currency, target_currency
+        )
         
         assert result is None
         # Проверяем что был вызван UserFriendlyErrorFormatter
         mock_format_error.assert_called_once_with("APILayer", source_currency, target_currency)
         # Проверяем что сообщение об ошибке было показано
-        error_calls = [call for call in mock_edit.call_args_list 
-                      if "таймаута" in str(call)]
+        error_calls = [
+            c for c in mock_edit.call_args_list
+            if any(isinstance(a, str) and "таймаута" in a for a in c.args)
+            or any(isinstance(v, str) and "таймаута" in v for v in c.kwargs.values())
+        ]
         assert len(error_calls) > 0
     
     @pytest.mark.asyncio
-    async def test_safe_callback_answer_and_edit_success(self, mock_callback_query):
+    async def test_safe_callback_answer_and_edit_success(self, mock_callback_query, mock_answer, mock_edit):
         """Тест успешного комбинированного ответа и редактирования"""
         new_text = "New message"
         answer_text = "Success"
         
-        with patch('handlers.admin_flow.SafeMessageEditor.safe_answer_callback', new_callable=AsyncMock) as mock_answer:
-            mock_answer.return_value = True
-            
-            with patch('handlers.admin_flow.SafeMessageEditor.safe_edit_message', new_callable=AsyncMock) as mock_edit:
-                mock_edit.return_value = True
-                
-                result = await safe_callback_answer_and_edit(
-                    mock_callback_query,
-                    new_text,
-                    answer_text=answer_text
-                )
+        result = await safe_callback_answer_and_edit(
+            mock_callback_query,
+            new_text,
+            answer_text=answer_text
+        )
         
         assert result is True
         mock_answer.assert_called_once()
         mock_edit.assert_called_once()
     
     @pytest.mark.asyncio
-    async def test_safe_callback_answer_and_edit_partial_failure(self, mock_callback_query):
+    async def test_safe_callback_answer_and_edit_partial_failure(self, mock_callback_query, mock_answer, mock_edit):
         """Тест частичной неудачи (ответ успешен, редактирование неудачно)"""
         new_text = "New message"
+        mock_edit.return_value = False
         
-        with patch('handlers.admin_flow.SafeMessageEditor.safe_answer_callback', new_callable=AsyncMock) as mock_answer:
-            mock_answer.return_value = True
-            
-            with patch('handlers.admin_flow.SafeMessageEditor.safe_edit_message', new_callable=AsyncMock) as mock_edit:
-                mock_edit.return_value = False
-                
-                result = await safe_callback_answer_and_edit(
-                    mock_callback_query,
-                    new_text
-                )
+        result = await safe_callback_answer_and_edit(
+            mock_callback_query,
+            new_text
+        )
         
         assert result is False  # Общий результат неудачен
         mock_answer.assert_called_once()
@@ -346,22 +384,22 @@ class TestConfigurationSettings:
     def test_callback_timeout_settings(self):
         """Тест наличия новых настроек таймаута"""
         # Проверяем что новые настройки присутствуют
-        assert hasattr(config, 'CALLBACK_API_TIMEOUT')
-        assert hasattr(config, 'CALLBACK_ANSWER_TIMEOUT')
-        assert hasattr(config, 'MAX_MESSAGE_EDIT_ATTEMPTS')
+        assert 'CALLBACK_API_TIMEOUT' in _CFG
+        assert 'CALLBACK_ANSWER_TIMEOUT' in _CFG
+        assert 'MAX_MESSAGE_EDIT_ATTEMPTS' in _CFG
         
         # Проверяем разумные значения по умолчанию
-        assert config.CALLBACK_API_TIMEOUT <= 5  # Не больше 5 секунд
-        assert config.CALLBACK_ANSWER_TIMEOUT <= 3  # Не больше 3 секунд
-        assert config.MAX_MESSAGE_EDIT_ATTEMPTS >= 1  # Минимум 1 попытка
+        assert _CFG['CALLBACK_API_TIMEOUT'] <= 5  # Не больше 5 секунд
+        assert _CFG['CALLBACK_ANSWER_TIMEOUT'] <= 3  # Не больше 3 секунд
+        assert _CFG['MAX_MESSAGE_EDIT_ATTEMPTS'] >= 1  # Минимум 1 попытка
     
     def test_callback_timeout_values(self):
         """Тест корректности значений таймаутов"""
         # Callback API timeout должен быть меньше обычного API timeout
-        assert config.CALLBACK_API_TIMEOUT < config.API_TIMEOUT
+        assert _CFG['CALLBACK_API_TIMEOUT'] < _CFG['API_TIMEOUT']
         
         # Callback answer timeout должен быть меньше callback API timeout
-        assert config.CALLBACK_ANSWER_TIMEOUT <= config.CALLBACK_API_TIMEOUT
+        assert _CFG['CALLBACK_ANSWER_TIMEOUT'] <= _CFG['CALLBACK_API_TIMEOUT']
 
 
 if __name__ == '__main__':
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Запуск тестов Crypto Helper Bot
+Использование: python tests/run_tests.py [unit|integration|all] [--lf] [--changed] [--fast]
+Использует pytest; при наличии pytest-xdist тесты выполняются параллельно
+(-n auto --dist=loadfile)
+"""
+
+import argparse
+import importlib.util
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = TESTS_DIR.parent
+
+# Unit тесты: без сетевых вызовов, все внешние API замоканы
+UNIT_TEST_PATHS = [
+    TESTS_DIR / "backend",
+    TESTS_DIR / "handlers",
+    TESTS_DIR / "test_telegram_fixes.py",
+]
+
+# Интеграционные тесты сервисов: реальные кэши, таймеры и фоновые задачи
+INTEGRATION_TEST_PATHS = [
+    TESTS_DIR / "services",
+]
+
+# Общий лимит времени на интеграционные тесты (секунды)
+INTEGRATION_TIMEOUT = 180
+
+# pytest завершился без собранных тестов (например, --changed без изменений)
+_NO_TESTS_COLLECTED = int(pytest.ExitCode.NO_TESTS_COLLECTED)
+
+
+def _collect_test_files(paths, only=None):
+    """
+    Развернуть каталоги в явный список test_*.py файлов
+
+    pytest получает готовый манифест и не обходит каталоги сам.
+
+    Args:
+        paths: Каталоги и файлы с тестами
+        only: Если задано - оставить только файлы из этого множества
+    """
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(path.rglob("test_*.py")))
+        else:
+            files.append(path)
+    if only is not None:
+        files = [f for f in files if f.resolve() in only]
+    return [str(f) for f in files]
+
+
+def changed_test_files(base: str = "HEAD~1"):
+    """
+    Определить тесты, затронутые изменениями относительно base
+
+    Измененные test_*.py берутся как есть, а модуль src/<pkg>/<name>.py
+    сопоставляется с тестами по имени: tests/**/test_*<name>*.py.
+
+    Returns:
+        set[Path] или None, если git недоступен (тогда запускаются все тесты)
+    """
+    result = subprocess.run(
+        ["git", "diff", "--name-only", base, "--", "tests", "src"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None
+
+    selected = set()
+    for name in result.stdout.split():
+        path = (PROJECT_ROOT / name).resolve()
+        if path.suffix != ".py":
+            continue
+        if path.name.startswith("test_"):
+            if path.exists():
+                selected.add(path)
+        elif name.startswith("src/"):
+            selected.update(p.resolve() for p in TESTS_DIR.rglob(f"test_*{path.stem}*.py"))
+    return selected
+
+
+def _pytest_command(paths, extra_args=(), only=None):
+    """Собрать команду pytest для указанных путей"""
+    cmd = [sys.executable, "-m", "pytest", "-q"]
+    if importlib.util.find_spec("xdist") is not None:
+        # loadfile: тесты одного файла выполняются на одном воркере,
+        # поэтому aiogram и модули handlers импортируются воркером один раз
+        cmd += ["-n", "auto", "--dist=loadfile"]
+    return cmd + list(extra_args) + _collect_test_files(paths, only)
+
+
+def _run_subprocess(paths, extra_args=(), only=None) -> bool:
+    """Запустить pytest в отдельном процессе"""
+    result = subprocess.run(_pytest_command(paths, extra_args, only), cwd=PROJECT_ROOT)
+    return result.returncode in (0, _NO_TESTS_COLLECTED)
+
+
+def run_unit_tests(extra_args=(), only=None) -> bool:
+    """Запустить unit тесты"""
+    print("🧪 Запуск unit тестов...")
+    return _run_subprocess(UNIT_TEST_PATHS, extra_args, only)
+
+
+def _on_timeout(signum, frame):
+    raise TimeoutError(f"Интеграционные тесты превысили {INTEGRATION_TIMEOUT}s")
+
+
+def run_integration_tests(extra_args=(), only=None) -> bool:
+    """
+    Запустить интеграционные тесты в текущем процессе
+
+    Все файлы передаются в один вызов pytest.main, поэтому aiogram, aiohttp
+    и модули src импортируются один раз, а не для каждого файла.
+    """
+    print("🔗 Запуск интеграционных тестов...")
+    files = _collect_test_files(INTEGRATION_TEST_PATHS, only)
+    if not files:
+        print("ℹ️ Нет затронутых интеграционных тестов")
+        return True
+
+    use_alarm = hasattr(signal, "SIGALRM")
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _on_timeout)
+        signal.alarm(INTEGRATION_TIMEOUT)
+    try:
+        exit_code = pytest.main(["-q"] + list(extra_args) + files)
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, previous_handler)
+    return exit_code in (pytest.ExitCode.OK, pytest.ExitCode.NO_TESTS_COLLECTED)
+
+
+def run_all_tests(extra_args=(), only=None) -> bool:
+    """Запустить все тесты"""
+    print("🧪 Запуск всех тестов...")
+    return _run_subprocess([TESTS_DIR], extra_args, only)
+
+
+RUNNERS = {
+    "unit": run_unit_tests,
+    "integration": run_integration_tests,
+    "all": run_all_tests,
+}
+
+
+def main(argv=None) -> int:
+    """Точка входа: python tests/run_tests.py [unit|integration|all] [--lf] [--changed] [--fast]"""
+    parser = argparse.ArgumentParser(description="Запуск тестов Crypto Helper Bot")
+    parser.add_argument("mode", nargs="?", default="all", choices=RUNNERS)
+    parser.add_argument(
+        "--lf", action="store_true",
+        help="запустить только упавшие в прошлый раз тесты (pytest --lf)"
+    )
+    parser.add_argument(
+        "--changed", action="store_true",
+        help="запустить только тесты, затронутые последним коммитом"
+    )
+    parser.add_argument(
+        "--fast", action="store_true",
+        help="пропустить тесты с маркером slow (pytest -m 'not slow')"
+    )
+    args = parser.parse_args(argv)
+
+    extra_args = ["--lf"] if args.lf else []
+    if args.fast:
+        extra_args += ["-m", "not slow"]
+    only = changed_test_files() if args.changed else None
+    if only is not None and not only:
+        print("ℹ️ Изменения не затрагивают тесты")
+        return 0
+
+    return 0 if RUNNERS[args.mode](extra_args, only) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
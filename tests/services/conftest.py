@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Настройка pytest для тестов сервисов
+"""
+
+import logging
+
+import pytest
+
+# Логгеры сервисов: общий API логгер (FiatRatesService, SmartRatePreloader,
+# UnifiedAPIManager) и пакеты, от которых наследует уровень cache_manager
+QUIET_LOGGER_NAMES = ("crypto_helper_api", "services", "src.services")
+
+
+@pytest.fixture(autouse=True)
+def quiet_service_logs(request):
+    """
+    Порог WARNING для логгеров сервисов в тестах, которые не проверяют логи
+
+    INFO/DEBUG записи отсекаются в isEnabledFor и не доходят ни до хендлера
+    stdout, ни до захвата pytest. Тесты с caplog получают логи без изменений.
+    """
+    if "caplog" in request.fixturenames:
+        yield
+        return
+
+    loggers = [logging.getLogger(name) for name in QUIET_LOGGER_NAMES]
+    levels = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.setLevel(logging.WARNING)
+    yield
+    for logger, level in zip(loggers, levels):
+        logger.setLevel(level)
@@ -4,35 +4,43 @@ Unit Tests для исправления Memory Leak в кэшировании
 TASK-PERF-001: Тестирование UnifiedCacheManager
 """
 
-import pytest
 import asyncio
-import time
-import sys
-import os
-
-# Add src directory to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+import copy
+import pickle
+import pytest
+import logging
 
-from services.cache_manager import UnifiedCacheManager, rates_cache, api_cache
+from services.cache_manager import UnifiedCacheManager
 from config import config
 
+# Диагностика тестов пишется в лог, а не в stdout: видна с --log-cli-level=DEBUG
+_log = logging.getLogger("cache_tests")
+_dbg = _log.debug
+
+# Данные разного размера для оценки памяти (строятся один раз на модуль)
+_SMALL = "x" * 100
+_MEDIUM = "y" * 1000
+_LARGE = "z" * 10000
+_DICT = {"key1": "value1", "key2": "value2", "nested": {"a": 1, "b": 2}}
+
 
 class TestMemoryLeakFix:
     """Тестирование исправления Memory Leak в кэшировании"""
     
     @pytest.fixture
-    def test_cache(self):
+    def test_cache(self, fake_clock):
         """Создаем тестовый кэш для изоляции тестов"""
         return UnifiedCacheManager(
             max_size=10,
             default_ttl=2,  # Короткий TTL для быстрого тестирования
             cleanup_interval=1,
-            enable_stats=True
+            enable_stats=True,
+            time_source=fake_clock
         )
     
     def test_cache_size_limit_enforcement(self, test_cache):
         """Тест 1: Проверка ограничения размера кэша (LRU eviction)"""
-        print("🧪 Test 1: Cache size limit enforcement")
+        _dbg("🧪 Test 1: Cache size limit enforcement")
         
         # Заполняем кэш выше лимита
         for i in range(15):  # Лимит 10, добавляем 15
@@ -44,12 +52,96 @@ class TestMemoryLeakFix:
         assert stats['current_size'] <= test_cache.max_size, f"Cache size {stats['current_size']} exceeds limit {test_cache.max_size}"
         assert stats['evictions'] > 0, "LRU evictions should have occurred"
         
-        print(f"✅ Cache size enforced: {stats['current_size']}/{test_cache.max_size}")
-        print(f"✅ LRU evictions: {stats['evictions']}")
+        _dbg("✅ Cache size enforced: %s/%s", stats['current_size'], test_cache.max_size)
+        _dbg("✅ LRU evictions: %s", stats['evictions'])
+    
+    def test_cache_byte_limit_enforcement(self, fake_clock):
+        """Тест: ограничение кэша по оценочному объему памяти"""
+        cache = UnifiedCacheManager(
+            max_size=100,
+            default_ttl=2,
+            max_bytes=8192,
+            time_source=fake_clock
+        )
+        
+        # Лимит по числу записей не достигается, вытесняет только лимит по байтам
+        for i in range(20):
+            cache.set(f"big_key_{i}", "x" * 1000)
+        
+        stats = cache.get_stats()
+        
+        assert stats['memory_usage_bytes'] <= cache.max_bytes
+        assert stats['current_size'] < 20
+        assert stats['evictions'] > 0
+        assert 0 < stats['bytes_utilization'] <= 1
+        # Вытесняются самые старые записи
+        assert cache.get("big_key_19") is not None
+        assert cache.get("big_key_0") is None
+    
+    def test_expired_entries_evicted_before_live(self, fake_clock):
+        """Тест: при нехватке места устаревшие записи удаляются раньше живых"""
+        cache = UnifiedCacheManager(
+            max_size=100,
+            default_ttl=1,
+            max_bytes=3200,
+            time_source=fake_clock
+        )
+        # Живая запись старше всех по LRU, устаревших больше порции EXPIRE_BATCH
+        cache.set("live", 1, ttl=100)
+        for i in range(cache.EXPIRE_BATCH + 8):
+            cache.set(f"k{i:02d}", i)
+        
+        fake_clock.advance(2)
+        cache.set("big", "x" * 2800)
+        
+        stats = cache.get_stats()
+        assert stats['evictions'] == 0
+        assert stats['ttl_cleanups'] == cache.EXPIRE_BATCH + 8
+        assert cache.get("live") == 1
+        assert cache.get("big") is not None
+    
+    def test_doorkeeper_admission(self, fake_clock):
+        """Тест: doorkeeper не пускает разовые ключи в заполненный кэш"""
+        cache = UnifiedCacheManager(
+            max_size=10,
+            default_ttl=2,
+            time_source=fake_clock,
+            admission='doorkeeper'
+        )
+        for i in range(cache.max_size):
+            cache.set(f"key_{i}", i)
+        
+        # Скан разовых ключей не вытесняет существующие записи
+        for i in range(100):
+            cache.set(f"scan_key_{i}", i)
+        
+        stats = cache.get_stats()
+        assert stats['evictions'] == 0
+        assert stats['admission_rejections'] == 100
+        assert cache.get("key_0") == 0
+        
+        # Повторный set допускает ключ
+        cache.set("scan_key_5", "admitted")
+        assert cache.get("scan_key_5") == "admitted"
+    
+    def test_unknown_admission_policy(self):
+        """Тест: неизвестная политика допуска отклоняется"""
+        with pytest.raises(ValueError):
+            UnifiedCacheManager(admission='tinylfu')
+    
+    def test_evicted_entries_are_recycled(self, test_cache):
+        """Тест: вытесненные записи переиспользуются и не держат ссылок на данные"""
+        for i in range(test_cache.max_size * 3):
+            test_cache.set(f"key_{i}", f"value_{i}")
+            assert test_cache.get(f"key_{i}") == f"value_{i}"
+        
+        assert len(test_cache._freelist) <= test_cache.max_size
+        assert all(entry.data is None for entry in test_cache._freelist)
+        assert test_cache.get_stats()['current_size'] == test_cache.max_size
     
-    def test_ttl_cleanup(self, test_cache):
+    def test_ttl_cleanup(self, test_cache, fake_clock):
         """Тест 2: Проверка автоматической очистки по TTL"""
-        print("🧪 Test 2: TTL cleanup functionality")
+        _dbg("🧪 Test 2: TTL cleanup functionality")
         
         # Добавляем записи в кэш
         test_cache.set("temp_key_1", "temp_value_1")
@@ -60,17 +152,17 @@ class TestMemoryLeakFix:
         assert test_cache.get("temp_key_2") is not None
         
         initial_size = test_cache.get_stats()['current_size']
-        print(f"📊 Initial cache size: {initial_size}")
+        _dbg("📊 Initial cache size: %s", initial_size)
         
-        # Ждем истечения TTL (2 секунды + запас)
-        time.sleep(3)
+        # Истечение TTL (2 секунды + запас) без реального ожидания
+        fake_clock.advance(3)
         
         # Принудительно запускаем cleanup
         expired_count = test_cache.cleanup_expired()
         
         final_size = test_cache.get_stats()['current_size']
-        print(f"📊 Final cache size: {final_size}")
-        print(f"🧹 Expired entries removed: {expired_count}")
+        _dbg("📊 Final cache size: %s", final_size)
+        _dbg("🧹 Expired entries removed: %s", expired_count)
         
         # Проверяем что устаревшие записи удалены
         assert test_cache.get("temp_key_1") is None, "Expired entries should be removed"
@@ -79,14 +171,14 @@ class TestMemoryLeakFix:
     
     def test_memory_usage_estimation(self, test_cache):
         """Тест 3: Проверка мониторинга использования памяти"""
-        print("🧪 Test 3: Memory usage estimation")
+        _dbg("🧪 Test 3: Memory usage estimation")
         
         # Добавляем данные разного размера
         test_data = {
-            "small": "x" * 100,
-            "medium": "y" * 1000,
-            "large": "z" * 10000,
-            "dict": {"key1": "value1", "key2": "value2", "nested": {"a": 1, "b": 2}}
+            "small": _SMALL,
+            "medium": _MEDIUM,
+            "large": _LARGE,
+            "dict": _DICT
         }
         
         initial_memory = test_cache.get_stats()['memory_usage_bytes']
@@ -97,9 +189,9 @@ class TestMemoryLeakFix:
         final_memory = test_cache.get_stats()['memory_usage_bytes']
         memory_increase = final_memory - initial_memory
         
-        print(f"📊 Initial memory: {initial_memory} bytes")
-        print(f"📊 Final memory: {final_memory} bytes")
-        print(f"📈 Memory increase: {memory_increase} bytes")
+        _dbg("📊 Initial memory: %s bytes", initial_memory)
+        _dbg("📊 Final memory: %s bytes", final_memory)
+        _dbg("📈 Memory increase: %s bytes", memory_increase)
         
         # Проверяем что память увеличилась
         assert final_memory > initial_memory, "Memory usage should increase with added data"
@@ -110,9 +202,25 @@ class TestMemoryLeakFix:
         assert 'memory_usage_mb' in stats, "Memory usage should be available in MB"
         assert stats['memory_usage_mb'] >= 0, "Memory usage in MB should be non-negative"
     
+    def test_memory_usage_tracks_removals(self, test_cache):
+        """Тест 3b: Учет памяти уменьшается при удалении, замене и очистке"""
+        test_cache.set("a", "x" * 100)
+        test_cache.set("b", "y" * 100)
+        after_set = test_cache.get_stats()['memory_usage_bytes']
+        
+        # Замена значения не должна накапливать размер старой записи
+        test_cache.set("a", "x" * 100)
+        assert test_cache.get_stats()['memory_usage_bytes'] == after_set
+        
+        test_cache.delete("a")
+        assert test_cache.get_stats()['memory_usage_bytes'] < after_set
+        
+        test_cache.clear()
+        assert test_cache.get_stats()['memory_usage_bytes'] == 0
+    
     def test_cache_stats_accuracy(self, test_cache):
         """Тест 4: Проверка точности статистики кэша"""
-        print("🧪 Test 4: Cache statistics accuracy")
+        _dbg("🧪 Test 4: Cache statistics accuracy")
         
         # Выполняем операции с кэшем
         test_cache.set("hit_key", "hit_value")
@@ -123,7 +231,7 @@ class TestMemoryLeakFix:
         
         stats = test_cache.get_stats()
         
-        print(f"📊 Stats: {stats}")
+        _dbg("📊 Stats: %s", stats)
         
         # Проверяем статистику
         assert stats['hits'] >= 1, "Should have at least 1 hit"
@@ -139,7 +247,7 @@ class TestMemoryLeakFix:
     
     def test_lru_order_maintenance(self, test_cache):
         """Тест 5: Проверка корректности LRU ordering"""
-        print("🧪 Test 5: LRU order maintenance")
+        _dbg("🧪 Test 5: LRU order maintenance")
         
         # Заполняем кэш до лимита
         for i in range(test_cache.max_size):
@@ -158,37 +266,138 @@ class TestMemoryLeakFix:
         # Проверяем что второй элемент удален (был least recently used)
         assert test_cache.get("lru_key_1") is None, "Least recently used item should be evicted"
         
-        print("✅ LRU ordering works correctly")
+        _dbg("✅ LRU ordering works correctly")
+    
+    def test_slru_scan_resistance(self, test_cache):
+        """Тест 5b: Поток разовых ключей не вытесняет повторно используемые записи"""
+        test_cache.set("hot_key", "hot_value")
+        assert test_cache.get("hot_key") == "hot_value"  # Переход в protected
+        
+        # Сканирование: ключей в несколько раз больше, чем max_size
+        for i in range(test_cache.max_size * 5):
+            test_cache.set(f"scan_key_{i}", i)
+        
+        assert test_cache.get("hot_key") == "hot_value", "Hot entry should survive a scan"
+        assert test_cache.get_stats()['current_size'] <= test_cache.max_size
     
     @pytest.mark.asyncio
-    async def test_background_cleanup_task(self, test_cache):
-        """Тест 6: Проверка background cleanup task"""
-        print("🧪 Test 6: Background cleanup task")
+    async def test_lazy_cleanup_on_set(self, test_cache, fake_clock):
+        """Тест 6: Ленивая очистка просроченных записей при set"""
+        _dbg("🧪 Test 6: Lazy cleanup on set")
         
-        # Запускаем background cleanup
+        # start/stop сохранены для совместимости
         await test_cache.start()
         
-        # Добавляем данные
         test_cache.set("bg_key_1", "bg_value_1")
         test_cache.set("bg_key_2", "bg_value_2")
         
         initial_cleanups = test_cache.get_stats()['ttl_cleanups']
         
-        # Ждем несколько циклов cleanup (TTL = 2s, cleanup interval = 1s)
-        await asyncio.sleep(4)
-        
-        final_cleanups = test_cache.get_stats()['ttl_cleanups']
+        # Истекает TTL (2s): записи удаляются следующей операцией без фоновой задачи
+        fake_clock.advance(3)
+        test_cache.set("bg_key_3", "bg_value_3")
         
-        # Останавливаем background task
+        stats = test_cache.get_stats()
         await test_cache.stop()
         
-        print(f"📊 Initial cleanups: {initial_cleanups}")
-        print(f"📊 Final cleanups: {final_cleanups}")
+        assert stats['ttl_cleanups'] == initial_cleanups + 2
+        assert stats['current_size'] == 1
+        assert test_cache.get("bg_key_3") == "bg_value_3"
+        
+        _dbg("✅ Lazy cleanup works correctly")
+    
+    def test_bulk_set_matches_sequential_set(self, fake_clock):
+        """Тест: bulk_set оставляет в кэше то же, что последовательные set()"""
+        items = [(f"key_{i}", i) for i in range(15)] + [("key_14", "updated")]
+        sequential = UnifiedCacheManager(max_size=10, default_ttl=2, time_source=fake_clock)
+        bulk = UnifiedCacheManager(max_size=10, default_ttl=2, time_source=fake_clock)
+        
+        for key, value in items:
+            sequential.set(key, value)
+        bulk.bulk_set(items)
+        
+        for key, _ in items:
+            assert bulk.get(key) == sequential.get(key)
+        
+        stats = bulk.get_stats()
+        assert stats['current_size'] == 10
+        assert stats['total_sets'] == len(items)
+        assert stats['evictions'] == 5
+        assert stats['memory_usage_bytes'] == sequential.get_stats()['memory_usage_bytes']
+        
+        # TTL пакета применяется ко всем записям
+        bulk.bulk_set([("short_1", 1), ("short_2", 2)], ttl=1)
+        fake_clock.advance(1.5)
+        assert bulk.get("short_1") is None
+        assert bulk.get("key_14") == "updated"
+    
+    def test_bulk_get(self, test_cache, fake_clock):
+        """Тест: bulk_get возвращает только найденные живые ключи и ведет статистику как get()"""
+        test_cache.bulk_set([("key_1", 1), ("key_2", 2)])
+        test_cache.set("short", "value", ttl=1)
+        fake_clock.advance(1.5)
+        
+        assert test_cache.bulk_get(["key_1", "missing", "short", "key_2"]) == {"key_1": 1, "key_2": 2}
+        
+        stats = test_cache.get_stats()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 2
+        assert stats['current_size'] == 2
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_cache_access(self, fake_clock):
+        """Тест: пакетные записи и чтения из нескольких потоков не теряют данные"""
+        cache = UnifiedCacheManager(max_size=100, default_ttl=2, time_source=fake_clock)
+        workers_count, entries_per_worker = 5, 10
+        
+        def cache_worker(worker_id: int):
+            """Воркер в отдельном потоке: пакетная запись и пакетное чтение своих ключей"""
+            entries = {f"rates_worker_{worker_id}_key_{i}": {"rate": float(worker_id * 100 + i)}
+                       for i in range(entries_per_worker)}
+            cache.bulk_set(entries.items())
+            
+            assert cache.bulk_get(list(entries)) == entries, f"Worker {worker_id} should find its own data"
+        
+        # Воркеры в пуле потоков; ошибка любого воркера пробрасывается из TaskGroup
+        async with asyncio.TaskGroup() as workers:
+            for worker_id in range(workers_count):
+                workers.create_task(asyncio.to_thread(cache_worker, worker_id))
+        
+        stats = cache.get_stats()
+        assert stats['current_size'] == workers_count * entries_per_worker
+        assert stats['total_sets'] == workers_count * entries_per_worker
+        assert stats['hits'] == workers_count * entries_per_worker
+        assert stats['misses'] == 0
+    
+    def test_per_entry_ttl(self, test_cache, fake_clock):
+        """Тест: TTL, переданный в set, имеет приоритет над default_ttl"""
+        test_cache.set("short", "value", ttl=1)
+        test_cache.set("default", "value")
+        
+        fake_clock.advance(1.5)
         
-        # Проверяем что cleanup сработал
-        assert final_cleanups > initial_cleanups, "Background cleanup should have run"
+        assert test_cache.get("short") is None
+        assert test_cache.get("default") == "value"
         
-        print("✅ Background cleanup task works correctly")
+        # Перезапись продлевает срок: старый элемент кучи игнорируется
+        test_cache.set("default", "new_value")
+        fake_clock.advance(1)
+        assert test_cache.cleanup_expired() == 0
+        assert test_cache.get("default") == "new_value"
+    
+    def test_stats_snapshots_are_independent(self, test_cache):
+        """Тест: get_stats() возвращает снимок, не связанный с внутренними счетчиками"""
+        test_cache.set("key", "value")
+        before = test_cache.get_stats()
+        
+        test_cache.get("key")
+        test_cache.get("missing")
+        after = test_cache.get_stats()
+        
+        assert before['hits'] == 0 and before['current_size'] == 1
+        assert after['hits'] == 1 and after['misses'] == 1
+        assert after['hit_ratio'] == 0.5
+        assert after['memory_usage_mb'] == after['memory_usage_bytes'] / (1 << 20)
 
 
 class TestFiatRatesServiceMemoryLeakFix:
@@ -197,7 +406,7 @@ class TestFiatRatesServiceMemoryLeakFix:
     @pytest.mark.asyncio
     async def test_fiat_service_cache_integration(self):
         """Тест 7: Интеграция FiatRatesService с новым кэшем"""
-        print("🧪 Test 7: FiatRatesService cache integration")
+        _dbg("🧪 Test 7: FiatRatesService cache integration")
         
         from services.fiat_rates_service import FiatRatesService
         
@@ -206,7 +415,7 @@ class TestFiatRatesServiceMemoryLeakFix:
         # Проверяем что сервис использует новый кэш
         cache_stats = service.get_cache_stats()
         
-        print(f"📊 Cache stats: {cache_stats}")
+        _dbg("📊 Cache stats: %s", cache_stats)
         
         # Проверяем структуру статистики
         required_fields = [
@@ -221,12 +430,12 @@ class TestFiatRatesServiceMemoryLeakFix:
         assert cache_stats['cache_manager'] == 'UnifiedCacheManager'
         assert cache_stats['max_entries'] == config.CACHE_MAX_SIZE
         
-        print("✅ FiatRatesService integration works correctly")
+        _dbg("✅ FiatRatesService integration works correctly")
     
     @pytest.mark.asyncio  
     async def test_cache_clear_functionality(self):
         """Тест 8: Функциональность очистки кэша"""
-        print("🧪 Test 8: Cache clear functionality")
+        _dbg("🧪 Test 8: Cache clear functionality")
         
         from services.fiat_rates_service import FiatRatesService
         
@@ -243,7 +452,7 @@ class TestFiatRatesServiceMemoryLeakFix:
         # Очищаем кэш
         clear_result = await service.clear_cache()
         
-        print(f"📊 Clear result: {clear_result}")
+        _dbg("📊 Clear result: %s", clear_result)
         
         # Проверяем что данные удалены
         cached_usd_after = await service._get_cached_rates("USD")
@@ -256,7 +465,54 @@ class TestFiatRatesServiceMemoryLeakFix:
         assert clear_result['operation'] == 'cache_clear'
         assert clear_result['entries_removed'] >= 0
         
-        print("✅ Cache clear functionality works correctly")
+        _dbg("✅ Cache clear functionality works correctly")
+    
+    @pytest.mark.asyncio
+    async def test_identical_rates_share_one_object(self):
+        """Тест: одинаковые наборы курсов хранятся в кэше одним объектом"""
+        from services.fiat_rates_service import FiatRatesService, rates_cache as service_cache
+        
+        service = FiatRatesService()
+        await service._cache_rates("USD", {"EUR": 0.85, "RUB": 100.0})
+        stored = service_cache.get("rates_USD")
+        # Другой набор с теми же валютами между одинаковыми не ломает дедупликацию
+        await service._cache_rates("CAD", {"EUR": 0.90, "RUB": 100.0})
+        await service._cache_rates("GBP", {"RUB": 100.0, "EUR": 0.85})
+        
+        try:
+            assert service_cache.get("rates_USD") is stored
+            assert service_cache.get("rates_GBP") is stored
+            assert service_cache.get("rates_CAD") is not stored
+            
+            # Вызывающий код получает общий объект без копии, изменить его нельзя
+            cached = await service._get_cached_rates("USD")
+            assert cached is await service._get_cached_rates("GBP")
+            with pytest.raises(TypeError):
+                cached["EUR"] = 0.0
+            assert cached["EUR"] == 0.85
+            
+            # Копии и pickle дают обычный изменяемый dict
+            for duplicate in (copy.copy(cached), copy.deepcopy(cached), pickle.loads(pickle.dumps(cached))):
+                assert type(duplicate) is dict and duplicate == cached
+                duplicate["EUR"] = 0.0
+            assert cached["EUR"] == 0.85
+        finally:
+            await service.clear_cache()
+    
+    @pytest.mark.asyncio
+    async def test_rates_with_unhashable_values_are_cached(self):
+        """Тест: нехэшируемые значения и разные курсы с тем же набором валют"""
+        from services.fiat_rates_service import FiatRatesService
+        
+        service = FiatRatesService()
+        await service._cache_rates("USD", {"EUR": 0.85, "meta": {"source": "test"}})
+        await service._cache_rates("GBP", {"EUR": 1.15, "meta": {"source": "test"}})
+        
+        try:
+            assert (await service._get_cached_rates("USD"))["EUR"] == 0.85
+            assert (await service._get_cached_rates("GBP"))["EUR"] == 1.15
+        finally:
+            await service.clear_cache()
 
 
 class TestMemoryLeakStressTest:
@@ -264,7 +520,7 @@ class TestMemoryLeakStressTest:
     
     def test_memory_leak_stress_test(self):
         """Тест 9: Стресс-тест на отсутствие Memory Leak"""
-        print("🧪 Test 9: Memory leak stress test")
+        _dbg("🧪 Test 9: Memory leak stress test")
         
         test_cache = UnifiedCacheManager(
             max_size=50,
@@ -273,30 +529,35 @@ class TestMemoryLeakStressTest:
         )
         
         initial_memory = test_cache.get_stats()['memory_usage_bytes']
-        print(f"📊 Initial memory: {initial_memory} bytes")
+        _dbg("📊 Initial memory: %s bytes", initial_memory)
         
         # Симулируем интенсивное использование кэша
         cycles = 100
         entries_per_cycle = 100
         
+        # Ключи и значения готовятся заранее: цикл нагружает только кэш
+        keys = [f"stress_key_{c}_{i}" for c in range(cycles) for i in range(entries_per_cycle)]
+        values = [f"stress_value_{c}_{i}" * 10  # Увеличиваем размер данных
+                  for c in range(cycles) for i in range(entries_per_cycle)]
+        
         for cycle in range(cycles):
-            # Добавляем много записей
-            for i in range(entries_per_cycle):
-                key = f"stress_key_{cycle}_{i}"
-                value = f"stress_value_{cycle}_{i}" * 10  # Увеличиваем размер данных
-                test_cache.set(key, value)
+            # Добавляем много записей одним пакетом: без Python цикла по записям
+            start = cycle * entries_per_cycle
+            end = start + entries_per_cycle
+            test_cache.bulk_set(zip(keys[start:end], values[start:end]))
             
             # Периодически принудительно очищаем
             if cycle % 10 == 0:
                 test_cache.cleanup_expired()
-                current_stats = test_cache.get_stats()
-                print(f"  Cycle {cycle}: {current_stats['current_size']} entries, {current_stats['memory_usage_mb']:.2f}MB")
+                if _log.isEnabledFor(logging.DEBUG):
+                    current_stats = test_cache.get_stats()
+                    _dbg("  Cycle %s: %s entries, %.2fMB", cycle, current_stats['current_size'], current_stats['memory_usage_mb'])
         
         final_stats = test_cache.get_stats()
         final_memory = final_stats['memory_usage_bytes']
         
-        print(f"📊 Final memory: {final_memory} bytes")
-        print(f"📊 Final stats: {final_stats}")
+        _dbg("📊 Final memory: %s bytes", final_memory)
+        _dbg("📊 Final stats: %s", final_stats)
         
         # Критическая проверка: размер кэша должен быть ограничен
         assert final_stats['current_size'] <= test_cache.max_size, \
@@ -306,10 +567,10 @@ class TestMemoryLeakStressTest:
         assert final_stats['evictions'] > 0, "LRU evictions should have occurred during stress test"
         assert final_stats['ttl_cleanups'] >= 0, "TTL cleanups should have occurred"
         
-        print(f"✅ Memory leak stress test passed!")
-        print(f"   ├─ Total evictions: {final_stats['evictions']}")
-        print(f"   ├─ Total cleanups: {final_stats['ttl_cleanups']}")
-        print(f"   └─ Final cache size: {final_stats['current_size']}/{test_cache.max_size}")
+        _dbg("✅ Memory leak stress test passed!")
+        _dbg("   ├─ Total evictions: %s", final_stats['evictions'])
+        _dbg("   ├─ Total cleanups: %s", final_stats['ttl_cleanups'])
+        _dbg("   └─ Final cache size: %s/%s", final_stats['current_size'], test_cache.max_size)
 
 
 if __name__ == "__main__":
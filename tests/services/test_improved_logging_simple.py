@@ -7,228 +7,202 @@ Tests TASK-CRYPTO-003: Улучшение логирования API ошибо
 import pytest
 import asyncio
 import logging
-from unittest.mock import Mock, patch
-from io import StringIO
-
-# Настройка для импорта модулей
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from unittest.mock import MagicMock, patch
 
 from src.services.fiat_rates_service import FiatRatesService, log_detailed_error
+from src.services.fiat_rates_service import logger as service_logger
+
+
+@pytest.fixture
+def mock_logger(monkeypatch):
+    """Mock логгера сервиса по спецификации logging.Logger, установленный на время теста"""
+    mock = MagicMock(spec=logging.Logger)
+    monkeypatch.setattr('src.services.fiat_rates_service.logger', mock)
+    return mock
 
 
 class TestImprovedLoggingSimple:
     """Простые тесты для улучшенного логирования"""
     
-    def test_log_detailed_error_function(self):
+    def test_log_detailed_error_function(self, caplog):
         """Тест функции детального логирования ошибок"""
-        # Создаем mock logger для захвата вывода
-        logger_output = StringIO()
-        handler = logging.StreamHandler(logger_output)
+        # Создаем тестовую ошибку
+        test_error = ValueError("Test error message")
         
-        # Настраиваем логгер
-        with patch('src.services.fiat_rates_service.logger') as mock_logger:
-            mock_logger.error = Mock()
-            
-            # Создаем тестовую ошибку
-            test_error = ValueError("Test error message")
-            
-            # Вызываем функцию логирования
+        # Вызываем функцию логирования: записи настоящего логгера попадают в caplog
+        with caplog.at_level(logging.ERROR, logger=service_logger.name):
             result = log_detailed_error("TEST_TYPE", test_error, "test context")
-            
-            # Проверяем результат
-            assert result['type'] == "TEST_TYPE"
-            assert result['message'] == "Test error message"
-            assert result['class'] == "ValueError"
-            assert result['context'] == "test context"
-            assert 'traceback' in result
-            
-            # Проверяем, что логирование было вызвано
-            mock_logger.error.assert_called_once()
-            call_args = mock_logger.error.call_args[0][0]
-            assert "🚨 TEST_TYPE ERROR in test context:" in call_args
-            assert "Type: ValueError" in call_args
-            assert "Message: Test error message" in call_args
+        
+        # Проверяем результат
+        assert result['type'] == "TEST_TYPE"
+        assert result['message'] == "Test error message"
+        assert result['class'] == "ValueError"
+        assert result['context'] == "test context"
+        assert 'traceback' in result
+        
+        # Проверяем, что логирование было вызвано
+        assert len(caplog.records) == 1
+        record = caplog.records[-1]
+        assert record.levelno == logging.ERROR
+        call_args = record.getMessage()
+        assert "🚨 TEST_TYPE ERROR in test context:" in call_args
+        assert "Type: ValueError" in call_args
+        assert "Message: Test error message" in call_args
     
     @pytest.mark.asyncio
-    async def test_missing_api_key_logging(self):
+    async def test_missing_api_key_logging(self, mock_logger):
         """Тест логирования при отсутствии API ключа"""
         service = FiatRatesService()
         service.api_key = None
         
-        with patch('src.services.fiat_rates_service.logger') as mock_logger:
-            mock_logger.warning = Mock()
-            mock_logger.info = Mock()
+        # Мокируем fallback rates
+        with patch.object(service, '_get_fallback_rates') as mock_fallback:
+            mock_fallback.return_value = {"EUR": 0.85}
             
-            # Мокируем fallback rates
-            with patch.object(service, '_get_fallback_rates') as mock_fallback:
-                mock_fallback.return_value = {"EUR": 0.85}
-                
-                result = await service.get_rates_from_base("USD")
-                
-                # Проверяем логирование отсутствия API ключа
-                mock_logger.warning.assert_called()
-                warning_call = mock_logger.warning.call_args[0][0]
-                assert "🔑 APILayer API key not configured" in warning_call
-                assert "Service: FiatRatesService" in warning_call
-                assert "Base currency: USD" in warning_call
-                assert "Fallback available: True" in warning_call
-                
-                # Проверяем результат
-                assert result == {"EUR": 0.85}
+            result = await service.get_rates_from_base("USD")
+            
+            # Проверяем логирование отсутствия API ключа
+            mock_logger.warning.assert_called()
+            warning_call = mock_logger.warning.call_args[0][0]
+            assert "🔑 APILayer API key not configured" in warning_call
+            assert "Service: FiatRatesService" in warning_call
+            assert "Base currency: USD" in warning_call
+            assert "Fallback available: True" in warning_call
+            
+            # Проверяем результат
+            assert result == {"EUR": 0.85}
     
     @pytest.mark.asyncio 
-    async def test_fallback_rates_loading_logging(self):
+    async def test_fallback_rates_loading_logging(self, mock_logger):
         """Тест логирования загрузки fallback rates"""
         service = FiatRatesService()
         
-        with patch('src.services.fiat_rates_service.logger') as mock_logger:
-            mock_logger.info = Mock()
-            
-            # Вызываем fallback rates
-            result = await service._get_fallback_rates("USD")
-            
-            # Проверяем логирование
-            mock_logger.info.assert_called()
-            info_call = mock_logger.info.call_args[0][0]
-            assert "🗄 LOADING FALLBACK RATES for USD" in info_call
-            assert "Source: Static historical data" in info_call
-            assert "Reason: APILayer unavailable" in info_call
-            
-            # Проверяем, что получили курсы
-            assert isinstance(result, dict)
-            assert len(result) > 0
+        # Вызываем fallback rates
+        result = await service._get_fallback_rates("USD")
+        
+        # Проверяем логирование
+        mock_logger.info.assert_called()
+        info_call = mock_logger.info.call_args[0][0]
+        assert "🗄 LOADING FALLBACK RATES for USD" in info_call
+        assert "Source: Static historical data" in info_call
+        assert "Reason: APILayer unavailable" in info_call
+        
+        # Проверяем, что получили курсы
+        assert isinstance(result, dict)
+        assert len(result) > 0
     
     @pytest.mark.asyncio
-    async def test_health_check_logging(self):
+    async def test_health_check_logging(self, mock_logger):
         """Тест логирования health check"""
         service = FiatRatesService()
         
-        with patch('src.services.fiat_rates_service.logger') as mock_logger:
-            mock_logger.info = Mock()
+        # Мокируем get_fiat_rate для успешного health check
+        with patch.object(service, 'get_fiat_rate') as mock_get_rate:
+            mock_get_rate.return_value = 0.85
             
-            # Мокируем get_fiat_rate для успешного health check
-            with patch.object(service, 'get_fiat_rate') as mock_get_rate:
-                mock_get_rate.return_value = 0.85
-                
-                result = await service.health_check()
-                
-                # Проверяем логирование health check
-                mock_logger.info.assert_called()
-                info_calls = [call[0][0] for call in mock_logger.info.call_args_list]
-                
-                # Ищем лог старта health check
-                start_log = next((log for log in info_calls if "Performing APILayer health check" in log), None)
-                assert start_log is not None
-                
-                # Ищем лог завершения health check
-                complete_log = next((log for log in info_calls if "APILayer health check completed" in log), None)
-                assert complete_log is not None
-                
-                # Проверяем результат
-                assert result['status'] == 'healthy'
-                assert 'response_time_ms' in result
-                assert result['service'] == 'apilayer_fiat_rates'
+            result = await service.health_check()
+            
+            # Проверяем логирование health check
+            mock_logger.info.assert_called()
+            info_calls = [call[0][0] for call in mock_logger.info.call_args_list]
+            
+            # Ищем лог старта health check
+            start_log = next((log for log in info_calls if "Performing APILayer health check" in log), None)
+            assert start_log is not None
+            
+            # Ищем лог завершения health check
+            complete_log = next((log for log in info_calls if "APILayer health check completed" in log), None)
+            assert complete_log is not None
+            
+            # Проверяем результат
+            assert result['status'] == 'healthy'
+            assert 'response_time_ms' in result
+            assert result['service'] == 'apilayer_fiat_rates'
     
-    def test_log_detailed_error_with_real_traceback(self):
+    def test_log_detailed_error_with_real_traceback(self, mock_logger):
         """Тест логирования ошибки с реальным трейсбеком"""
-        with patch('src.services.fiat_rates_service.logger') as mock_logger:
-            mock_logger.error = Mock()
-            
-            try:
-                # Создаем реальную ошибку с трейсбеком
-                raise ValueError("Test error with traceback")
-            except ValueError as e:
-                result = log_detailed_error("TRACEBACK_TEST", e, "test context")
-                
-                # Проверяем, что трейсбек записан
-                assert result['traceback'] != 'No traceback available'
-                assert 'ValueError: Test error with traceback' in result['traceback']
-                
-                # Проверяем формат логирования
-                mock_logger.error.assert_called_once()
-                call_args = mock_logger.error.call_args[0][0]
-                assert "🚨 TRACEBACK_TEST ERROR" in call_args
-                assert "└─ Traceback:" in call_args
+        try:
+            # Создаем реальную ошибку с трейсбеком
+            raise ValueError("Test error with traceback")
+        except ValueError as e:
+            result = log_detailed_error("TRACEBACK_TEST", e, "test context")
+            
+            # Проверяем, что трейсбек записан
+            assert result['traceback'] != 'No traceback available'
+            assert 'ValueError: Test error with traceback' in result['traceback']
+            
+            # Проверяем формат логирования
+            mock_logger.error.assert_called_once()
+            call_args = mock_logger.error.call_args[0][0]
+            assert "🚨 TRACEBACK_TEST ERROR" in call_args
+            assert "└─ Traceback:" in call_args
     
     @pytest.mark.asyncio
-    async def test_network_error_handling_and_logging(self):
+    async def test_network_error_handling_and_logging(self, mock_logger):
         """Тест обработки и логирования сетевых ошибок"""
         service = FiatRatesService()
         service.api_key = "test_key"
         
-        with patch('src.services.fiat_rates_service.logger') as mock_logger:
-            mock_logger.error = Mock()
-            mock_logger.critical = Mock()
-            mock_logger.info = Mock()
-            
-            # Мокируем сетевую ошибку на более высоком уровне
-            with patch.object(service, '_rate_limit') as mock_rate_limit, \
-                 patch.object(service, '_get_fallback_rates') as mock_fallback, \
-                 patch('aiohttp.ClientSession.get') as mock_get:
-                
-                # Мокируем сетевую ошибку без проблемы ssl
-                from aiohttp import ClientError
-                network_error = ClientError("Connection refused")
-                mock_get.side_effect = network_error
-                mock_fallback.return_value = {"EUR": 0.85}
-                
-                result = await service.get_rates_from_base("USD")
-                
-                # Проверяем, что была ошибка и использован fallback
-                assert result == {"EUR": 0.85}
-                
-                # Проверяем что было логирование ошибки
-                assert mock_logger.error.called or mock_logger.critical.called
+        # Мокируем сетевую ошибку на более высоком уровне
+        with patch.object(service, '_rate_limit') as mock_rate_limit, \
+             patch.object(service, '_get_fallback_rates') as mock_fallback, \
+             patch('aiohttp.ClientSession.get') as mock_get:
+            
+            # Мокируем сетевую ошибку без проблемы ssl
+            from aiohttp import ClientError
+            network_error = ClientError("Connection refused")
+            mock_get.side_effect = network_error
+            mock_fallback.return_value = {"EUR": 0.85}
+            
+            result = await service.get_rates_from_base("USD")
+            
+            # Проверяем, что была ошибка и использован fallback
+            assert result == {"EUR": 0.85}
+            
+            # Проверяем что было логирование ошибки
+            assert mock_logger.error.called or mock_logger.critical.called
     
     @pytest.mark.asyncio
-    async def test_api_key_validation_logging(self):
+    async def test_api_key_validation_logging(self, mock_logger):
         """Тест логирования валидации API ключа"""
         service = FiatRatesService()
         
         # Тест с пустым API ключом
         service.api_key = ""
         
-        with patch('src.services.fiat_rates_service.logger') as mock_logger:
-            mock_logger.warning = Mock()
+        with patch.object(service, '_get_fallback_rates') as mock_fallback:
+            mock_fallback.return_value = {"EUR": 0.85}
             
-            with patch.object(service, '_get_fallback_rates') as mock_fallback:
-                mock_fallback.return_value = {"EUR": 0.85}
-                
-                result = await service.get_rates_from_base("USD")
-                
-                # Проверяем логирование отсутствия ключа
-                mock_logger.warning.assert_called()
-                warning_call = mock_logger.warning.call_args[0][0]
-                assert "🔑 APILayer API key not configured" in warning_call
+            result = await service.get_rates_from_base("USD")
+            
+            # Проверяем логирование отсутствия ключа
+            mock_logger.warning.assert_called()
+            warning_call = mock_logger.warning.call_args[0][0]
+            assert "🔑 APILayer API key not configured" in warning_call
         
         # Тест с правильным API ключом
         service.api_key = "test_valid_key"
         
-        with patch('src.services.fiat_rates_service.logger') as mock_logger:
-            mock_logger.info = Mock()
+        # Мокируем успешный запрос
+        with patch.object(service, 'session') as mock_session, \
+             patch.object(service, '_rate_limit'), \
+             patch.object(service, '_cache_rates'):
             
-            # Мокируем успешный запрос
-            with patch.object(service, 'session') as mock_session, \
-                 patch.object(service, '_rate_limit'), \
-                 patch.object(service, '_cache_rates'):
+            # Мокируем успешный ответ (но проще просто проверить что нет warning)
+            # В реальности тест будет через fallback из-за сложности мокирования
+            with patch.object(service, '_get_fallback_rates') as mock_fallback:
+                mock_fallback.return_value = {"EUR": 0.85}
                 
-                # Мокируем успешный ответ (но проще просто проверить что нет warning)
-                # В реальности тест будет через fallback из-за сложности мокирования
-                with patch.object(service, '_get_fallback_rates') as mock_fallback:
-                    mock_fallback.return_value = {"EUR": 0.85}
+                # Мокируем отсутствие кэша
+                with patch.object(service, '_get_cached_rates') as mock_cache:
+                    mock_cache.return_value = None
+                    
+                    # Принудительно используем fallback (имитируем ошибку соединения)
+                    service.api_key = None
+                    result = await service.get_rates_from_base("USD")
                     
-                    # Мокируем отсутствие кэша
-                    with patch.object(service, '_get_cached_rates') as mock_cache:
-                        mock_cache.return_value = None
-                        
-                        # Принудительно используем fallback (имитируем ошибку соединения)
-                        service.api_key = None
-                        result = await service.get_rates_from_base("USD")
-                        
-                        # Проверяем что результат получен через fallback
-                        assert result == {"EUR": 0.85}
+                    # Проверяем что результат получен через fallback
+                    assert result == {"EUR": 0.85}
 
 
 if __name__ == "__main__":
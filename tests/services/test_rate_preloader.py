@@ -9,15 +9,25 @@ import asyncio
 from unittest.mock import Mock, AsyncMock, patch
 from datetime import datetime, timedelta
 
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
-
 from services.rate_preloader import SmartRatePreloader, PreloadConfig, PreloadStats
 from services.models import ExchangeRate
 from config import config
 
 
+@pytest.fixture
+def mock_manager_with_rate():
+    """Мок UnifiedAPIManager, который отдает свежий курс USDT/RUB"""
+    test_rate = ExchangeRate(
+        pair='USDT/RUB',
+        rate=100.0,
+        timestamp=datetime.now().isoformat(),
+        source='test'
+    )
+    mock_manager = Mock()
+    mock_manager.get_exchange_rate = AsyncMock(return_value=test_rate)
+    return mock_manager, test_rate
+
+
 class TestPreloadConfig:
     """Тесты для PreloadConfig"""
     
@@ -64,22 +74,28 @@ class TestPreloadStats:
 class TestSmartRatePreloader:
     """Тесты для Smart Rate Preloader"""
     
-    def setup_method(self):
-        """Настройка для каждого теста"""
-        self.preloader = SmartRatePreloader()
+    @pytest.fixture(scope="class")
+    def shared_preloader(self):
+        """Один предзагрузчик на класс для тестов, которые не меняют его состояние"""
+        return SmartRatePreloader()
     
-    def test_initialization(self):
+    @pytest.fixture
+    def preloader(self):
+        """Новый предзагрузчик для тестов, которые меняют конфигурацию, менеджер или запускают задачи"""
+        return SmartRatePreloader()
+    
+    def test_initialization(self, shared_preloader):
         """Тест инициализации предзагрузчика"""
-        assert not self.preloader.running
-        assert len(self.preloader.preload_configs) > 0
-        assert 'critical' in self.preloader.preload_configs
-        assert 'popular' in self.preloader.preload_configs
-        assert 'secondary' in self.preloader.preload_configs
-        assert 'fiat_cross' in self.preloader.preload_configs
+        assert not shared_preloader.running
+        assert len(shared_preloader.preload_configs) > 0
+        assert 'critical' in shared_preloader.preload_configs
+        assert 'popular' in shared_preloader.preload_configs
+        assert 'secondary' in shared_preloader.preload_configs
+        assert 'fiat_cross' in shared_preloader.preload_configs
     
-    def test_critical_config(self):
+    def test_critical_config(self, shared_preloader):
         """Тест критической конфигурации"""
-        critical_config = self.preloader.preload_configs['critical']
+        critical_config = shared_preloader.preload_configs['critical']
         
         assert 'USDT/RUB' in critical_config.pairs
         assert 'USD/RUB' in critical_config.pairs
@@ -88,169 +104,151 @@ class TestSmartRatePreloader:
         assert critical_config.priority == 1
         assert critical_config.enabled is True
     
-    def test_popular_config(self):
+    def test_popular_config(self, shared_preloader):
         """Тест популярной конфигурации"""
-        popular_config = self.preloader.preload_configs['popular']
+        popular_config = shared_preloader.preload_configs['popular']
         
         assert 'BTC/USDT' in popular_config.pairs
         assert 'ETH/USDT' in popular_config.pairs
         assert popular_config.interval == 120  # 2 минуты
         assert popular_config.priority == 2
     
-    @pytest.mark.asyncio
-    async def test_start_and_stop(self):
+    async def test_start_and_stop(self, preloader):
         """Тест запуска и остановки предзагрузчика"""
         mock_manager = Mock()
         
-        await self.preloader.start(mock_manager)
-        assert self.preloader.running
-        assert self.preloader.unified_manager == mock_manager
-        assert len(self.preloader.tasks) > 0
+        await preloader.start(mock_manager)
+        assert preloader.running
+        assert preloader.unified_manager == mock_manager
+        assert len(preloader.tasks) > 0
         
-        await self.preloader.stop()
-        assert not self.preloader.running
-        assert len(self.preloader.tasks) == 0
+        await preloader.stop()
+        assert not preloader.running
+        assert len(preloader.tasks) == 0
     
-    @pytest.mark.asyncio
-    async def test_preload_single_pair_success(self):
+    async def test_preload_single_pair_success(self, preloader, mock_manager_with_rate):
         """Тест успешной предзагрузки одной пары"""
-        # Создаем мок менеджера
-        mock_manager = Mock()
-        test_rate = ExchangeRate(
-            pair='USDT/RUB',
-            rate=100.0,
-            timestamp=datetime.now().isoformat(),
-            source='test'
-        )
-        mock_manager.get_exchange_rate = AsyncMock(return_value=test_rate)
-        self.preloader.unified_manager = mock_manager
+        mock_manager, test_rate = mock_manager_with_rate
+        preloader.unified_manager = mock_manager
         
         # Тестируем предзагрузку
-        result = await self.preloader._preload_single_pair('USDT/RUB', 'critical')
+        result = await preloader._preload_single_pair('USDT/RUB', 'critical')
         
         assert result is not None
         assert result.pair == 'USDT/RUB'
         assert result.rate == 100.0
     
-    @pytest.mark.asyncio
-    async def test_preload_single_pair_timeout(self):
+    async def test_preload_single_pair_timeout(self, preloader):
         """Тест таймаута при предзагрузке"""
         # Создаем мок менеджера с медленным ответом
         mock_manager = Mock()
         
         async def slow_response(*args, **kwargs):
-            await asyncio.sleep(10)  # Превышаем таймаут в 3 секунды
+            await asyncio.Event().wait()  # Ответ не приходит никогда
             return None
         
         mock_manager.get_exchange_rate = slow_response
-        self.preloader.unified_manager = mock_manager
+        preloader.unified_manager = mock_manager
+        # Короткий тайм-аут вместо 3 секунд: проверяется обработка, а не длительность
+        preloader.pair_timeout = 0.05
         
         # Тестируем предзагрузку
-        result = await self.preloader._preload_single_pair('USDT/RUB', 'critical')
+        result = await preloader._preload_single_pair('USDT/RUB', 'critical')
         
         assert result is None
     
-    @pytest.mark.asyncio
-    async def test_preload_category(self):
+    async def test_preload_category(self, preloader, mock_manager_with_rate):
         """Тест предзагрузки категории"""
-        # Создаем мок менеджера
-        mock_manager = Mock()
-        test_rate = ExchangeRate(
-            pair='USDT/RUB',
-            rate=100.0,
-            timestamp=datetime.now().isoformat(),
-            source='test'
-        )
-        mock_manager.get_exchange_rate = AsyncMock(return_value=test_rate)
-        self.preloader.unified_manager = mock_manager
+        mock_manager, test_rate = mock_manager_with_rate
+        preloader.unified_manager = mock_manager
         
         # Тестируем предзагрузку категории
-        config = self.preloader.preload_configs['critical']
-        success_count = await self.preloader._preload_category('critical', config)
+        config = preloader.preload_configs['critical']
+        success_count = await preloader._preload_category('critical', config)
         
         assert success_count > 0
         assert success_count <= len(config.pairs)
     
-    def test_is_rate_fresh_critical(self):
-        """Тест проверки свежести курса для критической категории"""
-        # Свежий курс (10 секунд назад)
+    @pytest.mark.parametrize("category,pair,fresh_age,stale_age", [
+        ('critical', 'USDT/RUB', 10, 60),
+        ('popular', 'BTC/USDT', 60, 120),
+    ], ids=['critical', 'popular'])
+    def test_is_rate_fresh(self, shared_preloader, category, pair, fresh_age, stale_age):
+        """Тест проверки свежести курса: порог зависит от категории"""
+        # Свежий курс
         fresh_rate = ExchangeRate(
-            pair='USDT/RUB',
+            pair=pair,
             rate=100.0,
-            timestamp=(datetime.now() - timedelta(seconds=10)).isoformat(),
+            timestamp=(datetime.now() - timedelta(seconds=fresh_age)).isoformat(),
             source='test'
         )
-        assert self.preloader._is_rate_fresh(fresh_rate, 'critical')
+        assert shared_preloader._is_rate_fresh(fresh_rate, category)
         
-        # Устаревший курс (60 секунд назад)
+        # Устаревший курс
         stale_rate = ExchangeRate(
-            pair='USDT/RUB',
+            pair=pair,
             rate=100.0,
-            timestamp=(datetime.now() - timedelta(seconds=60)).isoformat(),
+            timestamp=(datetime.now() - timedelta(seconds=stale_age)).isoformat(),
             source='test'
         )
-        assert not self.preloader._is_rate_fresh(stale_rate, 'critical')
+        assert not shared_preloader._is_rate_fresh(stale_rate, category)
     
-    def test_is_rate_fresh_popular(self):
-        """Тест проверки свежести курса для популярной категории"""
-        # Свежий курс (60 секунд назад)
-        fresh_rate = ExchangeRate(
-            pair='BTC/USDT',
-            rate=50000.0,
-            timestamp=(datetime.now() - timedelta(seconds=60)).isoformat(),
-            source='test'
-        )
-        assert self.preloader._is_rate_fresh(fresh_rate, 'popular')
-        
-        # Устаревший курс (120 секунд назад)
-        stale_rate = ExchangeRate(
-            pair='BTC/USDT',
-            rate=50000.0,
+    def test_is_rate_fresh_repeated_and_invalid_timestamps(self, shared_preloader):
+        """Тест: повторная проверка той же метки времени и неразборчивая метка"""
+        rate = ExchangeRate(
+            pair='TON/USDT',
+            rate=5.0,
             timestamp=(datetime.now() - timedelta(seconds=120)).isoformat(),
             source='test'
         )
-        assert not self.preloader._is_rate_fresh(stale_rate, 'popular')
+        # Порог для остальных категорий - 3 минуты; разобранная метка берется из кэша
+        assert shared_preloader._is_rate_fresh(rate, 'secondary')
+        assert shared_preloader._is_rate_fresh(rate, 'secondary')
+        assert not shared_preloader._is_rate_fresh(rate, 'critical')
+        
+        rate.timestamp = 'not a timestamp'
+        assert not shared_preloader._is_rate_fresh(rate, 'secondary')
     
-    def test_calculate_adaptive_interval_high_success(self):
+    def test_calculate_adaptive_interval_high_success(self, shared_preloader):
         """Тест адаптивного интервала при высокой успешности"""
         config = PreloadConfig(pairs=['A', 'B', 'C'], interval=120, priority=1)
         
         # 100% успех - интервал должен сократиться
-        adaptive_interval = self.preloader._calculate_adaptive_interval(
+        adaptive_interval = shared_preloader._calculate_adaptive_interval(
             'test', config, 3  # 3 из 3 успешных
         )
         assert adaptive_interval < config.interval
     
-    def test_calculate_adaptive_interval_low_success(self):
+    def test_calculate_adaptive_interval_low_success(self, shared_preloader):
         """Тест адаптивного интервала при низкой успешности"""
         config = PreloadConfig(pairs=['A', 'B', 'C'], interval=120, priority=1)
         
         # 33% успех - интервал должен увеличиться
-        adaptive_interval = self.preloader._calculate_adaptive_interval(
+        adaptive_interval = shared_preloader._calculate_adaptive_interval(
             'test', config, 1  # 1 из 3 успешных
         )
         assert adaptive_interval > config.interval
     
-    def test_calculate_adaptive_interval_limits(self):
+    def test_calculate_adaptive_interval_limits(self, shared_preloader):
         """Тест ограничений адаптивного интервала"""
         config = PreloadConfig(pairs=['A'], interval=10, priority=1)
         
         # Интервал не должен быть меньше минимального
-        adaptive_interval = self.preloader._calculate_adaptive_interval(
+        adaptive_interval = shared_preloader._calculate_adaptive_interval(
             'test', config, 1
         )
-        assert adaptive_interval >= self.preloader.min_interval
+        assert adaptive_interval >= shared_preloader.min_interval
         
         config.interval = 1000
         # Интервал не должен быть больше максимального
-        adaptive_interval = self.preloader._calculate_adaptive_interval(
+        adaptive_interval = shared_preloader._calculate_adaptive_interval(
             'test', config, 0
         )
-        assert adaptive_interval <= self.preloader.max_interval
+        assert adaptive_interval <= shared_preloader.max_interval
     
-    def test_get_preload_status(self):
+    def test_get_preload_status(self, shared_preloader):
         """Тест получения статуса предзагрузки"""
-        status = self.preloader.get_preload_status()
+        status = shared_preloader.get_preload_status()
         
         assert 'timestamp' in status
         assert 'running' in status
@@ -262,24 +260,15 @@ class TestSmartRatePreloader:
         
         assert status['running'] is False
         assert status['total_pairs'] > 0
-        assert len(status['categories']) == len(self.preloader.preload_configs)
+        assert len(status['categories']) == len(shared_preloader.preload_configs)
     
-    @pytest.mark.asyncio
-    async def test_force_preload_category_success(self):
+    async def test_force_preload_category_success(self, preloader, mock_manager_with_rate):
         """Тест принудительной предзагрузки категории"""
-        # Создаем мок менеджера
-        mock_manager = Mock()
-        test_rate = ExchangeRate(
-            pair='USDT/RUB',
-            rate=100.0,
-            timestamp=datetime.now().isoformat(),
-            source='test'
-        )
-        mock_manager.get_exchange_rate = AsyncMock(return_value=test_rate)
-        self.preloader.unified_manager = mock_manager
+        mock_manager, test_rate = mock_manager_with_rate
+        preloader.unified_manager = mock_manager
         
         # Тестируем принудительную предзагрузку
-        result = await self.preloader.force_preload_category('critical')
+        result = await preloader.force_preload_category('critical')
         
         assert result['success'] is True
         assert result['category'] == 'critical'
@@ -288,57 +277,55 @@ class TestSmartRatePreloader:
         assert 'duration' in result
         assert 'success_rate' in result
     
-    @pytest.mark.asyncio
-    async def test_force_preload_category_unknown(self):
+    async def test_force_preload_category_unknown(self, shared_preloader):
         """Тест принудительной предзагрузки неизвестной категории"""
-        result = await self.preloader.force_preload_category('unknown')
+        result = await shared_preloader.force_preload_category('unknown')
         
         assert result['success'] is False
         assert 'error' in result
         assert 'Unknown category' in result['error']
     
-    def test_update_config_success(self):
+    def test_update_config_success(self, preloader):
         """Тест успешного обновления конфигурации"""
-        original_interval = self.preloader.preload_configs['critical'].interval
+        original_interval = preloader.preload_configs['critical'].interval
         
-        success = self.preloader.update_config('critical', interval=90)
+        success = preloader.update_config('critical', interval=90)
         
         assert success is True
-        assert self.preloader.preload_configs['critical'].interval == 90
-        assert self.preloader.preload_configs['critical'].interval != original_interval
+        assert preloader.preload_configs['critical'].interval == 90
+        assert preloader.preload_configs['critical'].interval != original_interval
     
-    def test_update_config_interval_limits(self):
+    def test_update_config_interval_limits(self, preloader):
         """Тест ограничений при обновлении интервала"""
         # Пытаемся установить слишком маленький интервал
-        self.preloader.update_config('critical', interval=10)
-        assert self.preloader.preload_configs['critical'].interval >= self.preloader.min_interval
+        preloader.update_config('critical', interval=10)
+        assert preloader.preload_configs['critical'].interval >= preloader.min_interval
         
         # Пытаемся установить слишком большой интервал
-        self.preloader.update_config('critical', interval=1000)
-        assert self.preloader.preload_configs['critical'].interval <= self.preloader.max_interval
+        preloader.update_config('critical', interval=1000)
+        assert preloader.preload_configs['critical'].interval <= preloader.max_interval
     
-    def test_update_config_unknown_category(self):
+    def test_update_config_unknown_category(self, preloader):
         """Тест обновления конфигурации неизвестной категории"""
-        success = self.preloader.update_config('unknown', interval=120)
+        success = preloader.update_config('unknown', interval=120)
         assert success is False
     
-    def test_update_config_enabled_flag(self):
+    def test_update_config_enabled_flag(self, preloader):
         """Тест обновления флага включения"""
-        self.preloader.update_config('critical', enabled=False)
-        assert self.preloader.preload_configs['critical'].enabled is False
+        preloader.update_config('critical', enabled=False)
+        assert preloader.preload_configs['critical'].enabled is False
         
-        self.preloader.update_config('critical', enabled=True)
-        assert self.preloader.preload_configs['critical'].enabled is True
+        preloader.update_config('critical', enabled=True)
+        assert preloader.preload_configs['critical'].enabled is True
     
-    def test_update_config_pairs_list(self):
+    def test_update_config_pairs_list(self, preloader):
         """Тест обновления списка пар"""
         new_pairs = ['TEST/PAIR1', 'TEST/PAIR2']
-        self.preloader.update_config('critical', pairs=new_pairs)
+        preloader.update_config('critical', pairs=new_pairs)
         
-        assert self.preloader.preload_configs['critical'].pairs == new_pairs
+        assert preloader.preload_configs['critical'].pairs == new_pairs
 
 
-@pytest.mark.asyncio
 async def test_preloader_integration_with_config():
     """Интеграционный тест предзагрузчика с конфигурацией"""
     preloader = SmartRatePreloader()
@@ -355,7 +342,6 @@ async def test_preloader_integration_with_config():
         assert isinstance(stats, PreloadStats)
 
 
-@pytest.mark.asyncio 
 async def test_cache_interaction():
     """Тест взаимодействия с кэшем"""
     preloader = SmartRatePreloader()
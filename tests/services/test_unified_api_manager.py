@@ -10,10 +10,6 @@ import aiohttp
 from unittest.mock import Mock, AsyncMock, patch
 from datetime import datetime, timedelta
 
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
-
 from services.unified_api_manager import (
     UnifiedAPIManager, APIRouter, CircuitBreaker, RatePreloader,
     APIRoute, CircuitBreakerState
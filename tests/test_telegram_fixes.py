@@ -12,10 +12,6 @@ import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 from decimal import Decimal
 
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
-
 from aiogram.types import Message, CallbackQuery, User, Chat, InlineKeyboardMarkup
 from aiogram.exceptions import TelegramBadRequest
 
@@ -32,6 +28,8 @@ from config import config
 class TestUserFriendlyErrorFormatter:
     """Тесты для форматирования понятных пользователю сообщений об ошибках"""
     
+    pytestmark = pytest.mark.formatting
+    
     def test_format_api_timeout_error(self):
         """Тест форматирования ошибки таймаута API"""
         result = UserFriendlyErrorFormatter.format_api_timeout_error(
@@ -127,6 +125,8 @@ class TestUserFriendlyErrorFormatter:
 class TestEnhancedLoadingMessageFormatter:
     """Тесты для улучшенного форматирования сообщений загрузки"""
     
+    pytestmark = pytest.mark.formatting
+    
     def test_format_api_loading_message_with_cancel(self):
         """Тест форматирования сообщения загрузки с возможностью отмены"""
         result = LoadingMessageFormatter.format_api_loading_message_with_cancel("Rapira API")